@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for alignment results.
+
+Entries are keyed by the SHA-256 of (parameters, reference, query) and stored
+as NumPy .npy files under <root>/<key[:2]>/<key>.npy, so one directory can be
+shared by parallel workers, tasks and runs. Writes are atomic (temp file +
+rename). A hit refreshes the entry's mtime; when the directory grows beyond
+max_bytes the least recently used entries are removed until it is back under
+EVICT_TO of the limit.
+"""
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from cache_io import FILE_MODE
+
+EVICT_TO = 0.9
+
+
+class AlignmentCache:
+    def __init__(self, root, max_bytes=1 << 30, params=''):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.params = params
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, reference, query):
+        digest = hashlib.sha256()
+        for part in (self.params, reference, query):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + '.npy')
+
+    def get(self, reference, query):
+        """Cached array for the pair, or None."""
+        path = self._path(self.key(reference, query))
+        try:
+            value = np.load(path, allow_pickle=False)
+            os.utime(path)
+        except (OSError, ValueError, EOFError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, reference, query, value):
+        path = self._path(self.key(reference, query))
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            np.save(fh, value, allow_pickle=False)
+        os.chmod(tmp, FILE_MODE)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(tmp, path)
+
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        else:
+            self._size += os.path.getsize(path) - replaced
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        """(mtime, size, path) of every cache entry."""
+        entries = []
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if not entry.name.endswith('.npy'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache is under EVICT_TO of max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= EVICT_TO * self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+
+    def stats(self):
+        return f"Alignment cache: {self.hits} hits, {self.misses} misses ({self.root})"
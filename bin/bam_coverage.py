@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Breadth and depth coverage of IRMA segment BAMs, one wide row per sample.
+
+Each BAM is read once. Every reference position between a read's start and
+end is an M/=/X or D/N CIGAR position, so each read only adds a start and
+an end event; NumPy bins the events and their cumulative sum is the depth at
+every reference position. The CIGARs are never expanded, so the cost is one
+event pair per read whatever its length. Reads are filtered like the pileup
+defaults (unmapped, secondary, QC-fail, duplicate and orphan reads skipped);
+--min-mapping-quality drops low-MAPQ reads. Reads running past the end of a
+reference are clipped to it.
+
+The depth is not filtered by base quality, so it never matches the
+depth_analysis.py totals: those always drop bases below quality 13 (the
+pysam pileup cutoff, which --min-base-quality can only raise, and only for
+the *_Filtered columns). On low-quality (e.g. ONT) data the Breadth/MeanDepth
+columns here therefore read higher than the depth tables.
+
+Per segment (A_HA_H3 -> HA; A_MP -> M as in the COVERAGE columns) the row
+holds, over the whole reference length:
+
+  Breadth<t>x-<segment>      percent of positions with depth >= t, for every --thresholds t
+  MeanDepth-<segment>        mean depth
+  MedianDepth-<segment>      median depth
+  LowDepthRegions-<segment>  1-based intervals with depth below --low-depth ('1-35;1690-1701', or 'none')
+
+The CSV (<META_ID>_bam_coverage.csv) has a Sample column, so the report
+scripts merge it with the other per-sample tables. A segment found in more
+than one BAM keeps the deepest reference.
+
+Usage: python bam_coverage.py META_ID [BAM ...] [--thresholds 1,10,50,100] [--low-depth 10]
+                                               [--min-mapping-quality Q] [--threads N]
+"""
+import argparse
+import csv
+import glob
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pysam
+
+from depth_analysis import READ_CHUNK, SKIP_FLAGS
+from segments import segment_of
+
+THRESHOLDS = [1, 10, 50, 100]
+LOW_DEPTH = 10
+SEGMENT_ORDER = ['HA', 'NA', 'M', 'NP', 'NS', 'PA', 'PB1', 'PB2']
+
+
+# -----------------------------------------
+# Depth
+# -----------------------------------------
+def _add_events(events, offsets, lengths, ref_ids, ref_starts, ref_ends):
+    """Add +1/-1 events at the start/end of the reference span of a chunk of reads."""
+    limit = lengths[ref_ids]
+    events += np.bincount(offsets[ref_ids] + np.minimum(ref_starts, limit), minlength=events.size)
+    events -= np.bincount(offsets[ref_ids] + np.minimum(ref_ends, limit), minlength=events.size)
+
+
+def bam_depths(bam: str, min_mapping_quality: int = 0) -> dict:
+    """Reference -> per-position depth (int64 array over the reference length), in one pass over the BAM."""
+    with pysam.AlignmentFile(bam, "rb") as bf:
+        references = list(bf.references)
+        lengths = np.array(bf.lengths, dtype=np.int64)
+        # one event slot per position plus one past the end of every reference
+        offsets = np.cumsum(lengths + 1) - (lengths + 1)
+        events = np.zeros(int((lengths + 1).sum()), dtype=np.int64)
+
+        ref_ids, ref_starts, ref_ends = [], [], []
+        for read in bf.fetch(until_eof=True):
+            if read.flag & SKIP_FLAGS or (read.is_paired and not read.is_proper_pair):
+                continue
+            ref_end = read.reference_end
+            if ref_end is None or read.mapping_quality < min_mapping_quality:
+                continue
+            ref_ids.append(read.reference_id)
+            ref_starts.append(read.reference_start)
+            ref_ends.append(ref_end)
+            if len(ref_ids) == READ_CHUNK:
+                _add_events(events, offsets, lengths, np.array(ref_ids), np.array(ref_starts), np.array(ref_ends))
+                ref_ids, ref_starts, ref_ends = [], [], []
+        if ref_ids:
+            _add_events(events, offsets, lengths, np.array(ref_ids), np.array(ref_starts), np.array(ref_ends))
+
+    return {
+        ref: np.cumsum(events[offset:offset + length])
+        for ref, offset, length in zip(references, offsets.tolist(), lengths.tolist())
+    }
+
+
+# -----------------------------------------
+# Metrics
+# -----------------------------------------
+def runs_below(depth, threshold: int):
+    """(start, end) 1-based inclusive runs of positions with depth below threshold."""
+    padded = np.concatenate([[False], depth < threshold, [False]])
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[0::2] + 1, edges[1::2]
+
+
+def format_intervals(starts, ends) -> str:
+    return ';'.join(f"{s}-{e}" for s, e in zip(starts.tolist(), ends.tolist())) or 'none'
+
+
+def segment_metrics(depth, thresholds=THRESHOLDS, low_depth=LOW_DEPTH) -> dict:
+    """Breadth, mean/median depth and low-depth intervals of one reference."""
+    if depth.size == 0:
+        depth = np.zeros(1, dtype=np.int64)
+    metrics = {f"Breadth{t}x": round(float((depth >= t).mean() * 100), 2) for t in thresholds}
+    metrics['MeanDepth'] = round(float(depth.mean()), 2)
+    metrics['MedianDepth'] = float(np.median(depth))
+    metrics['LowDepthRegions'] = format_intervals(*runs_below(depth, low_depth))
+    return metrics
+
+
+def _bam_metrics(task):
+    bam, thresholds, low_depth, min_mapping_quality = task
+    return [
+        (
+            segment_of(ref, coverage_style=True),
+            depth.mean() if depth.size else 0.0,
+            segment_metrics(depth, thresholds, low_depth),
+        )
+        for ref, depth in bam_depths(bam, min_mapping_quality).items()
+    ]
+
+
+def sample_row(meta_id, bam_files, thresholds=THRESHOLDS, low_depth=LOW_DEPTH, min_mapping_quality=0, threads=1):
+    """The wide row of one sample: Sample plus '<metric>-<segment>' for every segment."""
+    tasks = [(bam, thresholds, low_depth, min_mapping_quality) for bam in sorted(bam_files)]
+    if threads <= 1 or len(tasks) <= 1:
+        results = list(map(_bam_metrics, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(threads, len(tasks))) as pool:
+            results = list(pool.map(_bam_metrics, tasks))
+
+    segments = {}
+    for segment, mean_depth, metrics in (entry for result in results for entry in result):
+        if segment not in segments or mean_depth > segments[segment][0]:
+            segments[segment] = (mean_depth, metrics)
+
+    order = [s for s in SEGMENT_ORDER if s in segments] + sorted(set(segments) - set(SEGMENT_ORDER))
+    row = {'Sample': meta_id}
+    for segment in order:
+        row.update({f"{name}-{segment}": value for name, value in segments[segment][1].items()})
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Breadth and depth coverage from IRMA BAM files")
+    parser.add_argument("meta_id", help="Sample ID, used for the Sample column and output name")
+    parser.add_argument("bams", nargs='*', help="BAM files (default: *.bam in the working directory)")
+    parser.add_argument(
+        "--thresholds",
+        default=','.join(map(str, THRESHOLDS)),
+        help="Comma-separated depths for the breadth columns (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--low-depth",
+        type=int,
+        default=LOW_DEPTH,
+        help="Depth below which positions are reported as low-depth regions (default: %(default)s)",
+    )
+    parser.add_argument("--min-mapping-quality", type=int, default=0, help="Skip reads below this MAPQ")
+    parser.add_argument("--threads", type=int, default=1, help="Worker processes, one BAM each (default: 1)")
+    args = parser.parse_args()
+
+    thresholds = [int(t) for t in args.thresholds.split(',') if t.strip()]
+    row = sample_row(args.meta_id, args.bams or glob.glob("*.bam"), thresholds, args.low_depth,
+                     args.min_mapping_quality, args.threads)
+
+    out_fn = f"{args.meta_id}_bam_coverage.csv"
+    with open(out_fn, 'w', newline='') as fo:
+        w = csv.writer(fo)
+        w.writerow(list(row))
+        w.writerow(list(row.values()))
+    print(f"Wrote {out_fn}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Time bam_coverage.py's depth pass against the depth_analysis.py backends.
+
+Uses the simulated ONT-like BAM of benchmark_depth_backends.py and checks
+that the per-position depth equals the depth_analysis.py totals (array
+backend without the base-quality filter) over the reference length.
+
+Usage: python benchmark_bam_coverage.py [--reads 5000] [--length 1800] [--repeat 3] [--pileup]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bam_coverage  # noqa: E402
+import depth_analysis  # noqa: E402
+from benchmark_depth_backends import REF_NAME, write_bam  # noqa: E402
+
+
+def best_of(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark bam_coverage.py depth against depth_analysis.py")
+    parser.add_argument("--reads", type=int, default=5000, help="Number of simulated reads")
+    parser.add_argument("--length", type=int, default=1800, help="Reference length")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repeats (best is reported)")
+    parser.add_argument("--pileup", action="store_true", help="Also time the pileup backend (slow)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bam = os.path.join(tmp, 'synthetic.bam')
+        write_bam(bam, args.reads, args.length)
+        t_cov, depths = best_of(lambda: bam_coverage.bam_depths(bam), args.repeat)
+        t_row, row = best_of(lambda: bam_coverage.sample_row('bench', [bam]), args.repeat)
+        t_array, contig = best_of(lambda: depth_analysis.count_array(bam, REF_NAME, min_bq=0), args.repeat)
+        t_pileup = best_of(lambda: depth_analysis.count_pileup(bam, REF_NAME), 1)[0] if args.pileup else None
+
+    expected = np.zeros(args.length, dtype=np.int64)
+    inside = contig.positions <= args.length
+    expected[contig.positions[inside] - 1] = contig.counts[:depth_analysis.ROW_LOWQ].sum(axis=0)[inside]
+
+    print(f"reads={args.reads} length={args.length}")
+    print(f"bam_coverage depth    : {t_cov * 1000:8.1f} ms")
+    print(f"bam_coverage row      : {t_row * 1000:8.1f} ms")
+    print(f"depth_analysis array  : {t_array * 1000:8.1f} ms  ({t_array / t_cov:.1f}x)")
+    if t_pileup is not None:
+        print(f"depth_analysis pileup : {t_pileup * 1000:8.1f} ms  ({t_pileup / t_cov:.1f}x)")
+    print(', '.join(f"{k}={v}" for k, v in row.items() if k != 'Sample'))
+    if not np.array_equal(depths[REF_NAME], expected):
+        print("MISMATCH: depth differs from the depth_analysis.py totals")
+        sys.exit(1)
+    print("Depth identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Compare the pileup and array counting backends of depth_analysis.py.
+
+Simulates ONT-like reads (substitutions, insertions, deletions, soft clips)
+against a random segment, writes an indexed BAM, runs both backends on it and
+checks that the rendered long-table rows are identical.
+
+Usage: python benchmark_depth_backends.py [--reads 5000] [--length 1800] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pysam
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import depth_analysis  # noqa: E402
+
+REF_NAME = 'A_HA_H3'
+
+
+def simulate_read(ref_seq, rng, read_len, error_rate):
+    """Return (start, query, cigar, qualities) for one read."""
+    start = rng.randrange(0, max(1, len(ref_seq) - read_len))
+    query, quals, cigar = [], [], []
+
+    def push(op, n=1):
+        if cigar and cigar[-1][0] == op:
+            cigar[-1] = (op, cigar[-1][1] + n)
+        else:
+            cigar.append((op, n))
+
+    clip = rng.randrange(0, 20)
+    query.extend(rng.choice('ACGT') for _ in range(clip))
+    quals.extend(rng.randrange(2, 40) for _ in range(clip))
+    if clip:
+        push(4, clip)
+
+    pos = start
+    while pos < min(len(ref_seq), start + read_len):
+        r = rng.random()
+        if r < error_rate / 3:  # deletion
+            n = rng.randrange(1, 4)
+            push(2, n)
+            pos += n
+            continue
+        if r < 2 * error_rate / 3:  # insertion
+            n = rng.randrange(1, 4)
+            query.extend(rng.choice('ACGT') for _ in range(n))
+            quals.extend(rng.randrange(2, 40) for _ in range(n))
+            push(1, n)
+            continue
+        base = ref_seq[pos]
+        if r < error_rate:
+            base = rng.choice('ACGTN')
+        query.append(base)
+        quals.append(rng.randrange(2, 40))
+        push(0)
+        pos += 1
+
+    if cigar[-1][0] in (1, 2, 4):  # never end on an indel
+        query.append(ref_seq[pos - 1] if pos <= len(ref_seq) else 'A')
+        quals.append(30)
+        push(4)
+    return start, ''.join(query), cigar, quals
+
+
+def write_bam(path, n_reads, length, seed=1):
+    rng = random.Random(seed)
+    ref_seq = ''.join(rng.choice('ACGT') for _ in range(length))
+    header = {'HD': {'VN': '1.6', 'SO': 'coordinate'}, 'SQ': [{'SN': REF_NAME, 'LN': length}]}
+    reads = [simulate_read(ref_seq, rng, rng.randrange(length // 2, length), 0.08) for _ in range(n_reads)]
+    reads.sort(key=lambda r: r[0])
+    with pysam.AlignmentFile(path, 'wb', header=header) as out:
+        for i, (start, query, cigar, quals) in enumerate(reads):
+            a = pysam.AlignedSegment(out.header)
+            a.query_name = f'read{i}'
+            a.reference_id = 0
+            a.reference_start = start
+            a.mapping_quality = 60
+            a.cigartuples = cigar
+            a.query_sequence = query
+            a.query_qualities = pysam.qualitystring_to_array(''.join(chr(q + 33) for q in quals))
+            out.write(a)
+    pysam.index(path)
+
+
+def run(backend, bam, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = depth_analysis.BACKENDS[backend](bam, REF_NAME)
+        rows = list(depth_analysis.long_rows('bench', result))
+        best = min(best, time.perf_counter() - t0)
+    return best, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark depth_analysis.py counting backends")
+    parser.add_argument("--reads", type=int, default=5000, help="Number of simulated reads (keep below 8000)")
+    parser.add_argument("--length", type=int, default=1800, help="Reference length")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repeats per backend (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bam = os.path.join(tmp, 'synthetic.bam')
+        write_bam(bam, args.reads, args.length)
+        t_pileup, rows_pileup = run('pileup', bam, args.repeat)
+        t_array, rows_array = run('array', bam, args.repeat)
+
+    print(f"reads={args.reads} length={args.length} rows={len(rows_pileup)}")
+    print(f"pileup: {t_pileup:8.3f} s")
+    print(f"array : {t_array:8.3f} s  ({t_pileup / t_array:.1f}x)")
+    if rows_pileup != rows_array:
+        print("MISMATCH: backends produced different rows")
+        sys.exit(1)
+    print("Outputs identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Compare fastx.read_fasta with Bio.SeqIO.parse on a 10k-record multi-FASTA.
+
+The records are segments from the bundled references_2324.fasta with random
+substitutions, written once wrapped at 60 columns and once single-line (the
+mmap reader with copy=False can then return zero-copy memoryviews), plus a
+gzip copy. Every reader must return the same IDs and sequences as SeqIO, and
+the mmap and streamed readers must agree on a file starting with a blank
+line. Module import time is measured in fresh interpreters.
+
+Usage: python benchmark_fastx.py [--records 10000] [--repeat 3]
+"""
+import argparse
+import gzip
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from Bio import SeqIO
+
+BIN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BIN)
+import fastx  # noqa: E402
+from benchmark_mutation_diff import REFERENCES  # noqa: E402
+
+
+def write_fasta(path, records, width=None, opener=open):
+    with opener(path, 'wt') as fh:
+        for record_id, seq in records:
+            lines = [seq] if width is None else [seq[i:i + width] for i in range(0, len(seq), width)]
+            fh.write(f">{record_id} sample record\n" + '\n'.join(lines) + '\n')
+
+
+def best_of(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def import_time(module):
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, '-c', f'import {module}'], check=True, cwd=BIN)
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark fastx.read_fasta against Bio.SeqIO")
+    parser.add_argument("--records", type=int, default=10000, help="Records in the test FASTA")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repeats (best is reported)")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    segments = [str(r.seq) for r in SeqIO.parse(REFERENCES, 'fasta')]
+    records = []
+    for i in range(args.records):
+        seq = list(rng.choice(segments))
+        for _ in range(rng.randrange(0, 20)):
+            seq[rng.randrange(len(seq))] = rng.choice('ACGTN')
+        records.append((f"sample{i}|seg", ''.join(seq)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wrapped = os.path.join(tmp, 'wrapped.fasta')
+        single = os.path.join(tmp, 'single.fasta')
+        gzipped = os.path.join(tmp, 'wrapped.fasta.gz')
+        write_fasta(wrapped, records, width=60)
+        write_fasta(single, records)
+        write_fasta(gzipped, records, width=60, opener=gzip.open)
+        leading = os.path.join(tmp, 'leading.fasta')
+        write_fasta(leading, records[:3], width=60)
+        with open(leading) as fh:
+            text = fh.read()
+        with open(leading, 'w') as fh:
+            fh.write('\n' + text)
+
+        cases = [
+            ('SeqIO.parse        wrapped', lambda: [(r.id, str(r.seq)) for r in SeqIO.parse(wrapped, 'fasta')]),
+            ('fastx              wrapped', lambda: list(fastx.read_fasta(wrapped))),
+            ('fastx mmap         wrapped', lambda: list(fastx.read_fasta(wrapped, mmap=True))),
+            ('SeqIO.parse        single ', lambda: [(r.id, str(r.seq)) for r in SeqIO.parse(single, 'fasta')]),
+            ('fastx              single ', lambda: list(fastx.read_fasta(single))),
+            ('fastx mmap         single ', lambda: list(fastx.read_fasta(single, mmap=True))),
+            ('fastx mmap no-copy single ',
+             lambda: [(i, bytes(s)) for i, s in fastx.read_fasta(single, mmap=True, copy=False)]),
+            ('SeqIO.parse        gzip   ',
+             lambda: [(r.id, str(r.seq)) for r in SeqIO.parse(gzip.open(gzipped, 'rt'), 'fasta')]),
+            ('fastx              gzip   ', lambda: list(fastx.read_fasta(gzipped))),
+        ]
+        expected = records
+        failed = False
+        baseline = None
+        for name, fn in cases:
+            elapsed, result = best_of(fn, args.repeat)
+            if name.startswith('SeqIO'):
+                baseline = elapsed
+                ok = result == expected
+            else:
+                ok = [(i.decode(), bytes(s).decode()) for i, s in result] == expected
+            failed |= not ok
+            print(f"{name}: {elapsed * 1000:8.1f} ms  ({baseline / elapsed:4.1f}x){'' if ok else '  MISMATCH'}")
+
+        streamed = [(i, bytes(s)) for i, s in fastx.read_fasta(leading)]
+        mapped = [(i, bytes(s)) for i, s in fastx.read_fasta(leading, mmap=True)]
+        ok = streamed == mapped and [(i.decode(), s.decode()) for i, s in streamed] == records[:3]
+        failed |= not ok
+        print(f"leading blank line : mmap and stream {'agree' if ok else 'MISMATCH'}")
+
+    print(f"import Bio.SeqIO: {import_time('Bio.SeqIO') * 1000:6.1f} ms")
+    print(f"import fastx    : {import_time('fastx') * 1000:6.1f} ms")
+    if failed:
+        sys.exit(1)
+    print("Records identical")
+
+
+if __name__ == "__main__":
+    main()
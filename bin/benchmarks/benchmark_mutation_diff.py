@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Compare the per-column and the coordinate-based difference extraction of
+mutation_finder.py on full-length PB2 and PB1 proteins.
+
+The proteins are translated from the bundled references_2324.fasta; each
+variant gets random substitutions, an insertion, a deletion and a run of '-'
+(as in Nextclade translations). Every variant is aligned once, then both diff
+implementations run on the same alignment and their strings must match.
+
+Usage: python benchmark_mutation_diff.py [--variants 20] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from Bio import SeqIO
+
+BIN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BIN)
+import mutation_finder  # noqa: E402
+from codon_engine import translate  # noqa: E402
+
+REFERENCES = os.path.join(os.path.dirname(BIN), 'assets', 'sequence_references', 'references_2324.fasta')
+SEGMENTS = ['A_H3_PB2', 'A_H3_PB1']
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+
+def legacy_differences(best_alignment):
+    """The original character-by-character walk over best_alignment[0] / [1]."""
+    differences = []
+    all_positions = []
+    ref_pos = 1
+
+    for i in range(len(best_alignment[0])):
+        ref_char = best_alignment[0][i]
+        seq_char = best_alignment[1][i]
+
+        if ref_char == "-":
+            if seq_char != "-":
+                if differences and differences[-1].startswith(f"ins{ref_pos}"):
+                    differences[-1] += seq_char
+                else:
+                    differences.append(f"ins{ref_pos}{seq_char}")
+            continue
+
+        if seq_char == "-":
+            differences.append(f"del{ref_pos}{ref_char}")
+            all_positions.append(f"{ref_char}{ref_pos}-")
+        else:
+            token = f"{ref_char}{ref_pos}{seq_char}"
+            all_positions.append(token)
+            if ref_char != seq_char:
+                differences.append(token)
+
+        if ref_char != "-":
+            ref_pos += 1
+
+    return ";".join(differences), ";".join(all_positions)
+
+
+def coordinate_differences(best_alignment):
+    return mutation_finder.diff_strings(mutation_finder.alignment_diffs(best_alignment))
+
+
+def mutate(protein, rng):
+    seq = list(protein)
+    for _ in range(rng.randrange(5, 40)):
+        seq[rng.randrange(len(seq))] = rng.choice(AMINO_ACIDS)
+    i = rng.randrange(len(seq))
+    seq[i:i] = rng.choices(AMINO_ACIDS, k=rng.randrange(1, 4))
+    i = rng.randrange(len(seq))
+    del seq[i:i + rng.randrange(1, 4)]
+    i = rng.randrange(len(seq))
+    seq[i:i + rng.randrange(1, 3)] = '--'
+    return ''.join(seq)
+
+
+def run(fn, alignments, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = [fn(a) for a in alignments]
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark mutation_finder.py difference extraction")
+    parser.add_argument("--variants", type=int, default=20, help="Mutated variants per segment")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repeats (best is reported)")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    references = {r.id: translate(str(r.seq)).split('*')[0] for r in SeqIO.parse(REFERENCES, 'fasta')}
+    aligner = mutation_finder.make_aligner()
+
+    failed = False
+    for segment in SEGMENTS:
+        protein = references[segment]
+        alignments = [aligner.align(protein, mutate(protein, rng))[0] for _ in range(args.variants)]
+        t_legacy, legacy = run(legacy_differences, alignments, args.repeat)
+        t_coords, coords = run(coordinate_differences, alignments, args.repeat)
+        print(f"{segment}: length={len(protein)} variants={len(alignments)}")
+        print(f"  per-column : {t_legacy:8.3f} s")
+        print(f"  coordinates: {t_coords:8.3f} s  ({t_legacy / t_coords:.1f}x)")
+        if legacy != coords:
+            print("  MISMATCH: implementations produced different strings")
+            failed = True
+    if failed:
+        sys.exit(1)
+    print("Outputs identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Compare the row-wise and the vectorized QC summary of report_QC_calculation.py
+on a synthetic merged report.
+
+Every row gets coverages, Nextclade frameshift and mixed-site columns and
+minor-variant counts for all segments, with the blanks, empty-like tokens
+('NA', 'n/a', '-', ...), invisible spaces and non-numeric values real
+reports contain. Both implementations process the same CSV, for each
+--mixed-source, and their outputs must be byte-identical.
+
+The legacy normalization puts its case-insensitive flag at the start of
+the pattern, as Python 3.11 requires; the matching is unchanged.
+
+Usage: python benchmark_qc_summary.py [--rows 10000] [--repeat 3] [--seed 1]
+"""
+import argparse
+import contextlib
+import filecmp
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import report_QC_calculation as qc  # noqa: E402
+
+# Mostly passing values, so that both clean and flagged rows are common
+COVERAGES = ['100'] * 40 + ['99.87'] * 20 + ['79.9', '80', '0.1', '0.05', '45.2', '', 'NA', 'n/a', 'failed']
+FRAMESHIFTS = ['No frameShifts'] * 60 + [' no frameshifts ', '', 'NA', '-', '12-15', 'HA1:310-312']
+MIXED = ['0'] * 60 + ['1', '2', '3', '4', '7', '', 'null', 'None', '2.5', 'x']
+TEXT = ['3C.2a1b.2a.2a.3a.1', 'J.2', '\u200b', '\u00a0', ' ', 'N/A', 'nan', 'Pass\ufeff', 'Review later']
+
+
+def legacy_qc_summary(row, mixed_cols=qc.MIXED_COLS):
+    """The original per-row rules, one pd.to_numeric call per value."""
+    segments_out = []
+    for seg in qc.SEGMENT_ORDER:
+        issues = []
+        for col in qc.FRAMESHIFT_COLS[seg]:
+            val = row.get(col)
+            if pd.isna(val):
+                continue
+            if str(val).strip().lower() != 'no frameshifts':
+                issues.append('FS')
+                break
+        cov_val = pd.to_numeric(row.get(qc.COVERAGE_COL[seg]), errors='coerce')
+        if pd.notna(cov_val) and (cov_val > 0.1) and (cov_val < 80):
+            issues.append('LC')
+        ms_sum = 0.0
+        for col in mixed_cols[seg]:
+            v = pd.to_numeric(row.get(col), errors='coerce')
+            if pd.notna(v):
+                ms_sum += float(v)
+        if ms_sum > 3:
+            issues.append('MS')
+        if issues:
+            segments_out.append(f"{seg}:{','.join(sorted(issues))}")
+    return '|'.join(segments_out)
+
+
+def legacy_process(in_csv, out_csv, mixed_source='nextclade'):
+    """The original process_file: per-column regex normalization and df.apply(axis=1)."""
+    df = pd.read_csv(in_csv, low_memory=False)
+    obj_cols = df.select_dtypes(include='object').columns
+    if len(obj_cols):
+        df[obj_cols] = df[obj_cols].apply(lambda s: s.str.replace('[\u00A0\u200B\uFEFF]', ' ', regex=True).str.strip())
+        df[obj_cols] = df[obj_cols].replace(
+            to_replace=r'(?i)^(?:na|nan|none|null|n/?a|-)?$',
+            value=pd.NA,
+            regex=True
+        )
+        df = df.replace(r'^\s*$', pd.NA, regex=True)
+    df['NGS_QC_Sum'] = df.apply(legacy_qc_summary, axis=1, mixed_cols=qc.MIXED_SOURCES[mixed_source])
+    df['NGS_QC_Sum'] = df['NGS_QC_Sum'].replace(r'^\s*$', '', regex=True)
+    df['GISAID_Comment'] = df['NGS_QC_Sum'].apply(lambda x: 'Review' if str(x).strip() else '')
+    df.to_csv(out_csv, index=False, na_rep='NA')
+
+
+def synthetic_report(path, rows, rng):
+    columns = {'Sample': [f"S{i:05d}" for i in range(rows)]}
+    for seg in qc.SEGMENT_ORDER:
+        columns[qc.COVERAGE_COL[seg]] = [rng.choice(COVERAGES) for _ in range(rows)]
+        for col in qc.FRAMESHIFT_COLS[seg]:
+            columns[col] = [rng.choice(FRAMESHIFTS) for _ in range(rows)]
+        for col in qc.MIXED_COLS[seg] + qc.MINOR_VARIANT_COLS[seg]:
+            columns[col] = [rng.choice(MIXED) for _ in range(rows)]
+    columns['Clade'] = [rng.choice(TEXT) for _ in range(rows)]
+    columns['Depth'] = [str(rng.randint(0, 5000)) for _ in range(rows)]
+    pd.DataFrame(columns).to_csv(path, index=False)
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized QC summary against the row-wise one")
+    parser.add_argument("--rows", type=int, default=10000, help="Rows of the synthetic report")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repeats (best is reported)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+
+    identical = True
+    with tempfile.TemporaryDirectory() as tmp:
+        report = os.path.join(tmp, 'report.csv')
+        synthetic_report(report, args.rows, random.Random(args.seed))
+        print(f"rows={args.rows}")
+        for source in sorted(qc.MIXED_SOURCES):
+            legacy_out = os.path.join(tmp, f'legacy_{source}.csv')
+            new_out = os.path.join(tmp, f'vectorized_{source}.csv')
+            t_legacy = best_of(lambda: legacy_process(report, legacy_out, source), args.repeat)
+            with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                t_new = best_of(lambda: qc.process_file(report, new_out, source), args.repeat)
+            same = filecmp.cmp(legacy_out, new_out, shallow=False)
+            identical &= same
+            reviews = (pd.read_csv(new_out, usecols=['GISAID_Comment'])['GISAID_Comment'] == 'Review').sum()
+            print(f"{source:9s} row-wise {t_legacy * 1000:8.1f} ms  vectorized {t_new * 1000:7.1f} ms  "
+                  f"({t_legacy / t_new:.1f}x)  {reviews} to review  {'identical' if same else 'MISMATCH'}")
+
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Startup cost of the bin/ scripts: separate launches vs fluseq-tools job files.
+
+For every fluseq-tools subcommand the script's top-level imports are timed:
+
+  cold    a fresh `python -c '<imports>'` process (what every module launch pays)
+  import  cold minus an empty interpreter start
+  warm    the same imports again inside one interpreter (what each further
+          job of a `fluseq-tools run` job file pays)
+
+The end-to-end check then runs coverage-finder on the bundled reference
+segments, once as separate python launches and once as one job file, and
+requires identical outputs.
+
+Usage: python benchmark_startup.py [--repeat 5] [--jobs 16]
+"""
+import argparse
+import ast
+import filecmp
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from Bio import SeqIO
+
+BIN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS = os.path.join(BIN, 'fluseq-tools')
+REFERENCES = os.path.join(os.path.dirname(BIN), 'assets', 'sequence_references', 'references_2324.fasta')
+ENV = {**os.environ, 'PYTHONPATH': BIN}
+sys.path.insert(0, BIN)
+
+
+def load_commands():
+    namespace = {'__file__': TOOLS, '__name__': 'fluseq_tools'}
+    with open(TOOLS) as fh:
+        exec(compile(fh.read(), TOOLS, 'exec'), namespace)
+    return namespace['COMMANDS']
+
+
+def top_level_imports(script):
+    """The module-level import statements of a script as source code."""
+    with open(os.path.join(BIN, script)) as fh:
+        tree = ast.parse(fh.read())
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return '\n'.join(ast.unparse(node) for node in imports) or 'pass'
+
+
+def time_process(code, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True, env=ENV, cwd=BIN, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def time_in_process(code, repeat):
+    exec(code, {})
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        exec(code, {})
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def end_to_end(n_jobs):
+    records = list(SeqIO.parse(REFERENCES, 'fasta'))
+    with tempfile.TemporaryDirectory() as tmp:
+        for sub in ('direct', 'jobs'):
+            os.makedirs(os.path.join(tmp, sub))
+        lines = []
+        for i in range(n_jobs):
+            fasta = os.path.join(tmp, f'seg{i}.fasta')
+            SeqIO.write([records[i % len(records)]], fasta, 'fasta')
+            lines.append(['coverage-finder', '--sample', f'S{i}', '--output', f'cov{i}.csv', fasta])
+
+        t0 = time.perf_counter()
+        for _, *args in lines:
+            subprocess.run([sys.executable, os.path.join(BIN, 'coverage_finder.py'), *args],
+                           check=True, cwd=os.path.join(tmp, 'direct'), stdout=subprocess.DEVNULL)
+        t_direct = time.perf_counter() - t0
+
+        job_file = os.path.join(tmp, 'jobs.tsv')
+        with open(job_file, 'w') as fh:
+            fh.writelines('\t'.join(line) + '\n' for line in lines)
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, TOOLS, 'run', job_file], check=True, cwd=os.path.join(tmp, 'jobs'),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        t_jobs = time.perf_counter() - t0
+
+        names = sorted(os.listdir(os.path.join(tmp, 'direct')))
+        _, mismatch, errors = filecmp.cmpfiles(os.path.join(tmp, 'direct'), os.path.join(tmp, 'jobs'), names,
+                                               shallow=False)
+    return t_direct, t_jobs, mismatch + errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark interpreter startup of the bin/ scripts")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repeats per command (median is reported)")
+    parser.add_argument("--jobs", type=int, default=16, help="coverage-finder jobs in the end-to-end check")
+    args = parser.parse_args()
+
+    baseline = time_process('pass', args.repeat)
+    print(f"empty interpreter: {baseline * 1000:7.1f} ms")
+    print(f"{'command':<26} {'cold ms':>8} {'import ms':>9} {'warm ms':>8}")
+    for name, (script, _) in load_commands().items():
+        code = top_level_imports(script)
+        try:
+            warm = time_in_process(code, args.repeat)
+        except ImportError as e:
+            print(f"{name:<26} skipped ({e})")
+            continue
+        cold = time_process(code, args.repeat)
+        print(f"{name:<26} {cold * 1000:8.1f} {(cold - baseline) * 1000:9.1f} {warm * 1000:8.3f}")
+
+    t_direct, t_jobs, mismatches = end_to_end(args.jobs)
+    print(f"coverage-finder x{args.jobs}: separate launches {t_direct:6.2f} s, "
+          f"one job file {t_jobs:6.2f} s ({t_direct / t_jobs:.1f}x)")
+    if mismatches:
+        print(f"MISMATCH: {', '.join(mismatches)}")
+        sys.exit(1)
+    print("Outputs identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Regression check for mutation_finder.py --aligner banded.
+
+Every protein translated from the bundled references_2324.fasta is compared
+against itself, against mutated variants (substitutions, an insertion, a
+deletion, a '-' run) and against a heavily diverged variant that should make
+the banded mode fall back to the global alignment. The differences and the
+full per-position lists must be identical for both aligners.
+
+Usage: python check_banded_alignment.py [--variants 10] [--seed 1]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from Bio import SeqIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import mutation_finder  # noqa: E402
+from benchmark_mutation_diff import AMINO_ACIDS, REFERENCES, mutate  # noqa: E402
+from codon_engine import translate  # noqa: E402
+
+
+def diverge(protein, rng, fraction=0.4):
+    return ''.join(rng.choice(AMINO_ACIDS) if rng.random() < fraction else aa for aa in protein)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check banded against global alignment in mutation_finder.py")
+    parser.add_argument("--variants", type=int, default=10, help="Mutated variants per reference protein")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    aligner = mutation_finder.make_aligner()
+    pairs = []
+    for record in SeqIO.parse(REFERENCES, 'fasta'):
+        protein = translate(str(record.seq)).split('*')[0]
+        if len(protein) < 2 * mutation_finder.MIN_ANCHOR:
+            continue
+        variants = [protein, diverge(protein, rng)] + [mutate(protein, rng) for _ in range(args.variants)]
+        pairs.extend((record.id, protein, variant) for variant in variants)
+
+    timings, calls = {}, {}
+    for banded in (False, True):
+        t0 = time.perf_counter()
+        calls[banded] = [mutation_finder.find_differences(p, v, banded=banded) for _, p, v in pairs]
+        timings[banded] = time.perf_counter() - t0
+    fallbacks = sum(mutation_finder.banded_align(aligner, p, v) is None for _, p, v in pairs)
+
+    mismatches = [name for (name, _, _), g, b in zip(pairs, calls[False], calls[True]) if g != b]
+    print(f"pairs={len(pairs)} banded fallbacks={fallbacks}")
+    print(f"global: {timings[False]:8.3f} s")
+    print(f"banded: {timings[True]:8.3f} s  ({timings[False] / timings[True]:.1f}x)")
+    if mismatches:
+        print(f"MISMATCH in {len(mismatches)} pairs: {', '.join(sorted(set(mismatches)))}")
+        sys.exit(1)
+    print("Mutation calls identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+File helpers shared by the on-disk caches in bin/ (the compiled
+mutation-of-interest index, the segment length table and the alignment
+cache): SHA-256 of a file, atomic JSON writes and the mode for cache files.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+
+def _file_mode() -> int:
+    """0644 under the process umask, for files created by mkstemp (which are 0600)."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o644 & ~umask
+
+
+# Cache files next to shared references must be readable by every user
+FILE_MODE = _file_mode()
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_json(data: dict, path: str) -> None:
+    """Write data as compact JSON to path atomically (temp file + rename)."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(data, fh, separators=(',', ':'))
+    os.chmod(tmp, FILE_MODE)
+    os.replace(tmp, path)
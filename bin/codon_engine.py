@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Codon table and array translation helpers shared by the bin/ scripts.
+
+Nucleotides are encoded as small integers (T=0, C=1, A=2, G=3, anything else
+4), codons as 16*b1 + 4*b2 + b3 (0-63, or 64 when any base is not ACGT) and
+translated through a 65-entry lookup array, so a whole segment or consensus
+is translated with a handful of NumPy operations:
+
+    from codon_engine import translate
+    translate("ATGGCGTAA")            # 'MA*'
+
+Codons that contain anything other than A/C/G/T translate to 'X'.
+"""
+import numpy as np
+
+# Full codon → AA map
+codon_to_aa = {
+    'TTT':'F','TTC':'F','TTA':'L','TTG':'L',
+    'CTT':'L','CTC':'L','CTA':'L','CTG':'L',
+    'ATT':'I','ATC':'I','ATA':'I','ATG':'M',
+    'GTT':'V','GTC':'V','GTA':'V','GTG':'V',
+    'TCT':'S','TCC':'S','TCA':'S','TCG':'S',
+    'CCT':'P','CCC':'P','CCA':'P','CCG':'P',
+    'ACT':'T','ACC':'T','ACA':'T','ACG':'T',
+    'GCT':'A','GCC':'A','GCA':'A','GCG':'A',
+    'TAT':'Y','TAC':'Y','TAA':'*','TAG':'*',
+    'CAT':'H','CAC':'H','CAA':'Q','CAG':'Q',
+    'AAT':'N','AAC':'N','AAA':'K','AAG':'K',
+    'GAT':'D','GAC':'D','GAA':'E','GAG':'E',
+    'TGT':'C','TGC':'C','TGA':'*','TGG':'W',
+    'CGT':'R','CGC':'R','CGA':'R','CGG':'R',
+    'AGT':'S','AGC':'S','AGA':'R','AGG':'R',
+    'GGT':'G','GGC':'G','GGA':'G','GGG':'G',
+}
+
+NUCLEOTIDES = 'TCAG'
+CODE_INVALID = 4
+CODON_INVALID = 64
+
+# byte → nucleotide code (case-insensitive)
+BASE_CODES = np.full(256, CODE_INVALID, dtype=np.uint8)
+for _i, _b in enumerate(NUCLEOTIDES):
+    BASE_CODES[ord(_b)] = _i
+    BASE_CODES[ord(_b.lower())] = _i
+
+# nucleotide code → byte, 'N' for invalid
+CODE_CHARS = np.frombuffer((NUCLEOTIDES + 'N').encode(), dtype=np.uint8)
+
+# codon index → amino acid byte, 'X' at CODON_INVALID
+AA_LUT = np.frombuffer(
+    (''.join(codon_to_aa[a + b + c] for a in NUCLEOTIDES for b in NUCLEOTIDES for c in NUCLEOTIDES) + 'X').encode(),
+    dtype=np.uint8,
+)
+
+
+def encode(seq) -> np.ndarray:
+    """Nucleotide codes for a str, bytes or uint8 array."""
+    if isinstance(seq, str):
+        seq = seq.encode()
+    if isinstance(seq, (bytes, bytearray, memoryview)):
+        seq = np.frombuffer(seq, dtype=np.uint8)
+    return BASE_CODES[seq]
+
+
+def codon_index(codes: np.ndarray) -> np.ndarray:
+    """Codon indices (0-63, CODON_INVALID) for consecutive triplets; a trailing partial codon is dropped."""
+    trip = codes[:len(codes) - len(codes) % 3].reshape(-1, 3).astype(np.int64)
+    idx = trip[:, 0] * 16 + trip[:, 1] * 4 + trip[:, 2]
+    idx[(trip == CODE_INVALID).any(axis=1)] = CODON_INVALID
+    return idx
+
+
+def codon_strings(codes: np.ndarray) -> np.ndarray:
+    """Codon strings for consecutive triplets of codes, invalid bases shown as 'N'."""
+    n = len(codes) - len(codes) % 3
+    return np.ascontiguousarray(CODE_CHARS[codes[:n]]).view('S3').astype('<U3')
+
+
+def translate_codes(codes: np.ndarray) -> np.ndarray:
+    """One-letter amino acids ('<U1' array) for consecutive triplets of codes."""
+    return AA_LUT[codon_index(codes)].view('S1').astype('<U1')
+
+
+def translate(seq, frame: int = 0) -> str:
+    """Translate a whole nucleotide sequence in the given reading frame (0-2)."""
+    return AA_LUT[codon_index(encode(seq)[frame:])].tobytes().decode()
+
+
+def translate_codons(codons):
+    """Translate an array of codon strings; anything not in the table becomes 'X'."""
+    codons = np.asarray(codons, dtype='S3')
+    if codons.size == 0:
+        return np.empty(0, dtype='<U1')
+    # short codons are NUL padded, and NUL encodes as invalid
+    return translate_codes(encode(codons.view(np.uint8)))
+
+
+def substitute_bases(codons, frames, bases):
+    """Replace the base at frame (1-3) of every codon; returns the new codon strings."""
+    chars = np.asarray(codons, dtype='<U3').view('<U1').reshape(-1, 3).copy()
+    chars[np.arange(len(chars)), np.asarray(frames) - 1] = bases
+    return np.char.add(np.char.add(chars[:, 0], chars[:, 1]), chars[:, 2])
@@ -1,76 +1,142 @@
-from Bio import SeqIO
-import pandas as pd
+#!/usr/bin/env python3
+"""
+Coverage of a sample's consensus segment FASTAs.
+
+Coverage is the share of called (non-N) bases over the expected segment
+length, in percent (at most 100). Expected lengths come from the segment
+references (--references, see segment_lengths.py) by type, subtype and
+segment; without references, or with a warning for a segment the
+references lack (most influenza B segments, see segment_lengths.py), the
+sequence length is used. All segment FASTAs of a sample are read in one
+process and written as one wide CSV (Sample, Coverage-<segment> ...). The segment and subtype are taken from the
+file name (<sample>_<nn>-<segment>-<subtype>.fa).
+
+With --threshold every segment is marked pass (coverage above the threshold)
+or fail in a TSV manifest; passing FASTAs are renamed to .fasta and
+concatenated into <sample>_coverage.fa.
+
+Usage:
+    coverage_finder.py --sample S1 --references references_2324.fasta --threshold 80 \\
+        S1_01-HA-H3N2.fa S1_02-NA-H3N2.fa ...
+"""
+import argparse
 import os
 import sys
+from typing import Optional
 
-fasta = sys.argv[1]
-output = sys.argv[2]
-name = sys.argv[3]
-segment = sys.argv[4]
-
-# Function to calculate coverage
-def calculate_coverage(sequence):
-    if 'HA-' in sequence:
-        length = 1800
-    elif 'NA-' in sequence:
-        length = 1450
-    elif 'PB2-' in sequence:
-        length = 2400
-    elif 'PB1-' in sequence:
-        length = 2400
-    elif 'PA-' in sequence:
-        length = 2300
-    elif 'NP-' in sequence:
-        length = 1600
-    elif 'NS-' in sequence:
-        length = 920
-    elif 'M-' in sequence:
-        length = 1100
-    else:
-        # Default length if no specific segment is found
-        length = len(sequence)
-    
+from fastx import read_fasta
+from segment_lengths import load_lengths
 
+MANIFEST_COLUMNS = ['Sample', 'Segment', 'File', 'Coverage', 'Status']
+
+
+def calculate_coverage(sequence: bytes, length: Optional[int] = None) -> float:
+    """Percent non-N bases of the expected length (the sequence length when unknown), at most 100."""
     raw_length = len(sequence)
-    sequence_upper = sequence.upper()  # Convert sequence to uppercase
-    n_count = sequence_upper.count('N')  # Count 'N' which now includes both 'N' and 'n'
+    length = length or raw_length
+    n_count = sequence.count(b'N') + sequence.count(b'n')
     print(f"Length: {length}, N count: {n_count}, Raw length: {raw_length}")
     coverage = (raw_length - n_count) / length * 100
-    if coverage < 0:
-        coverage = 0
-    return coverage
-   
-
-# Read FASTA file
-fasta_file = fasta
-
-# Initialize a list to store data
-data = []
-
-# Parse each record in the FASTA file
-for record in SeqIO.parse(fasta_file, "fasta"):
-    coverage = calculate_coverage(str(record.seq))
-    data.append({'id': record.id, 'coverage': coverage, 'Sample': name, 'Segment': segment})
-
-# Create DataFrame
-df = pd.DataFrame(data)
-
-
-
-# Pivot table to have one row per sample and separate columns for each 'id'
-df_pivot = df.pivot(index='Sample', columns='Segment', values='coverage')
-
-
-
-# Save DataFrame to CSV file
-txt_file = df_pivot.loc[name, segment]
-filename = name + '_' + segment + '_coverage.txt'
-
-with open(filename, 'w') as file:
-    file.write(str(txt_file))
-
-df_pivot.to_csv(output)
-
-
-
-
+    return min(max(coverage, 0), 100)
+
+
+def parse_filename(path: str) -> tuple:
+    """
+    (segment, subtype) of 'S1_01-HA-H3N2.fa' -> ('HA', 'H3N2'): the part after
+    the first '-' split at its last '-', the segment taken after any further '-'.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    segment_subtype = stem.split('-', 1)[1] if '-' in stem else stem
+    segment, _, subtype = segment_subtype.rpartition('-') if '-' in segment_subtype else (segment_subtype, '', '')
+    return segment.rsplit('-', 1)[-1], subtype
+
+
+def fasta_coverage(path: str, length: Optional[int] = None) -> float:
+    """Coverage of the single record of a segment FASTA."""
+    records = list(read_fasta(path))
+    if len(records) != 1:
+        raise ValueError(f"{path}: expected one record, found {len(records)}")
+    return calculate_coverage(records[0][1], length)
+
+
+def format_coverage(coverage) -> str:
+    return repr(float(coverage))
+
+
+# -----------------------------------------
+# Outputs
+# -----------------------------------------
+def write_wide_csv(path: str, sample: str, coverages: dict) -> None:
+    """One row per sample with a Coverage-<segment> column per segment."""
+    with open(path, 'w') as fh:
+        fh.write(','.join(['Sample'] + [f"Coverage-{segment}" for segment in coverages]) + '\n')
+        fh.write(','.join([sample] + [format_coverage(c) for c in coverages.values()]) + '\n')
+
+
+def write_manifest(path: str, rows: list) -> None:
+    with open(path, 'w') as fh:
+        fh.write('\t'.join(MANIFEST_COLUMNS) + '\n')
+        for row in rows:
+            fh.write('\t'.join(str(row[c]) for c in MANIFEST_COLUMNS) + '\n')
+
+
+def filter_fastas(rows: list, merged: str) -> None:
+    """Rename passing FASTAs to .fasta and concatenate them (in file name order) into merged."""
+    passed = []
+    for row in rows:
+        if row['Status'] == 'pass':
+            renamed = os.path.splitext(row['File'])[0] + '.fasta'
+            os.replace(row['File'], renamed)
+            passed.append(renamed)
+    if not passed:
+        print("No segment passed the coverage threshold")
+        return
+    with open(merged, 'wb') as out:
+        for path in sorted(passed):
+            with open(path, 'rb') as fh:
+                out.write(fh.read())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Coverage of a sample's consensus segment FASTAs")
+    parser.add_argument("fasta", nargs='+', help="Segment FASTAs of the sample")
+    parser.add_argument("--sample", required=True, help="Sample ID")
+    parser.add_argument("--references",
+                        help="Segment reference FASTA for the expected lengths (default: the sequence length)")
+    parser.add_argument("--output", help="Wide coverage CSV (default: <sample>_coverage.csv)")
+    parser.add_argument("--threshold", type=float,
+                        help="Segments with coverage above this pass; writes the manifest and filtered FASTAs")
+    parser.add_argument("--manifest", help="Pass/fail TSV (default: <sample>_coverage_qc.tsv)")
+    parser.add_argument("--merged", help="Concatenated passing FASTAs (default: <sample>_coverage.fa)")
+    args = parser.parse_args()
+
+    lengths = load_lengths(args.references) if args.references else None
+    coverages, rows = {}, []
+    for path in args.fasta:
+        segment, subtype = parse_filename(path)
+        if segment in coverages:
+            sys.exit(f"{path}: segment {segment} given twice")
+        print(f"Processing {os.path.basename(path)} (segment {segment})")
+        length = lengths.expected(segment, subtype) if lengths else None
+        if lengths and length is None:
+            print(f"Warning: no reference for segment {segment} ({subtype}) in {args.references}, "
+                  f"using the sequence length")
+        coverage = fasta_coverage(path, length)
+        coverages[segment] = coverage
+        passed = args.threshold is not None and coverage > args.threshold
+        rows.append({'Sample': args.sample, 'Segment': segment, 'File': path,
+                     'Coverage': format_coverage(coverage), 'Status': 'pass' if passed else 'fail'})
+
+    output = args.output or f"{args.sample}_coverage.csv"
+    write_wide_csv(output, args.sample, coverages)
+    print(f"Coverage written to {output}")
+
+    if args.threshold is not None:
+        manifest = args.manifest or f"{args.sample}_coverage_qc.tsv"
+        write_manifest(manifest, rows)
+        print(f"{sum(row['Status'] == 'pass' for row in rows)}/{len(rows)} segments passed, manifest written to {manifest}")
+        filter_fastas(rows, args.merged or f"{args.sample}_coverage.fa")
+
+
+if __name__ == "__main__":
+    main()
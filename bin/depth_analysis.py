@@ -1,97 +1,635 @@
-import pysam
+#!/usr/bin/env python3
+"""
+Per-position base counts, ratios and consensus codons from IRMA segment BAMs.
+
+Writes <META_ID>_long.csv with one row per (position, base) for every contig
+of every BAM in the working directory. With --threads > 1 the (BAM, contig)
+work units are counted in a process pool; results are always written in
+sorted BAM order and header contig order, so the output is reproducible.
+
+Counting backends:
+  pileup – the original pysam pileup walk (one Python step per read per column)
+  array  – opt-in: one pass over the reads of each contig; CIGAR blocks are
+           expanded with NumPy and A/T/C/G/N counts are accumulated into
+           arrays, so ratios, consensus and codons are whole-array
+           operations. It counts every read, so on columns deeper than the
+           pileup cap of 8000 reads its counts (and ratios) differ from the
+           pileup output; shallower columns are identical.
+
+Output layouts:
+  long    – four rows per position (A/T/C/G), written to <META_ID>_long.csv
+  compact – one row per position without the Base/Ratio columns, written to
+            <META_ID>_compact.csv (about 4x smaller)
+
+With --stream, positions are consumed as they come off the counting backend
+and each codon window is written as soon as its three positions are known;
+only the current window is held in memory. The pileup backend then reads the
+BAMs serially; the array backend only ever holds one count matrix of
+N_ROWS (12: raw, low-quality and quality-filtered counts) x reference length
+per contig, whatever the depth.
+
+With --format parquet the same columns are written instead to a dataset
+<META_ID>_depth.parquet/ partitioned by sample and segment (see
+depth_parquet.py), one contig at a time.
+
+Both backends apply the pileup defaults (min base quality 13, unmapped,
+secondary, QC-fail, duplicate and orphan reads skipped). Only pileup stops
+at 8000 reads per column.
+
+--min-base-quality / --min-mapping-quality add quality-filtered counts
+(A/T/C/G/N_Count_Filtered) next to the raw counts, computed in the same pass:
+reads below the mapping quality are dropped once per read, bases below the
+base quality once per base. Base-quality thresholds below 13 behave as 13.
+
+--rle also writes <META_ID>_depth_rle.tsv: the total depth of every contig
+as run-length encoded depth classes over the whole reference length (see
+depth_tracks.py), a few rows per segment, for dropout_regions.py.
+
+--pyramid also writes <META_ID>_depth_pyramid.tsv: the same total depth per
+position and binned into --pyramid-bins windows and whole segments, each
+with mean/min/max (see depth_tracks.py), so plots can read the resolution
+they need without the full table.
+
+Usage: python depth_analysis.py META_ID [--backend {pileup,array}] [--threads N]
+                                        [--layout {long,compact}] [--stream]
+                                        [--format {csv,parquet}]
+                                        [--min-base-quality Q] [--min-mapping-quality Q]
+                                        [--rle] [--rle-breaks 0,1,10,20,50,100,1000]
+                                        [--pyramid] [--pyramid-bins 1,10,100]
+"""
+import argparse
 import csv
 import glob
-import sys
-from collections import defaultdict
-
-# Usage: python depth_analysis.py META_ID
-meta_id = sys.argv[1]
-bam_files = glob.glob("*.bam")
-
-# Full codon → AA map
-codon_to_aa = {
-    'TTT':'F','TTC':'F','TTA':'L','TTG':'L',
-    'CTT':'L','CTC':'L','CTA':'L','CTG':'L',
-    'ATT':'I','ATC':'I','ATA':'I','ATG':'M',
-    'GTT':'V','GTC':'V','GTA':'V','GTG':'V',
-    'TCT':'S','TCC':'S','TCA':'S','TCG':'S',
-    'CCT':'P','CCC':'P','CCA':'P','CCG':'P',
-    'ACT':'T','ACC':'T','ACA':'T','ACG':'T',
-    'GCT':'A','GCC':'A','GCA':'A','GCG':'A',
-    'TAT':'Y','TAC':'Y','TAA':'*','TAG':'*',
-    'CAT':'H','CAC':'H','CAA':'Q','CAG':'Q',
-    'AAT':'N','AAC':'N','AAA':'K','AAG':'K',
-    'GAT':'D','GAC':'D','GAA':'E','GAG':'E',
-    'TGT':'C','TGC':'C','TGA':'*','TGG':'W',
-    'CGT':'R','CGC':'R','CGA':'R','CGG':'R',
-    'AGT':'S','AGC':'S','AGA':'R','AGG':'R',
-    'GGT':'G','GGC':'G','GGA':'G','GGG':'G',
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+import pysam
+
+import depth_tracks
+from codon_engine import CODE_INVALID, codon_strings, codon_to_aa, encode, translate_codes
+
+HEADER = [
+    'MetaID','BAM','Reference','Position',
+    'A_Count','T_Count','C_Count','G_Count','N_Count',
+    'A_Ratio','T_Ratio','C_Ratio','G_Ratio','N_Ratio',
+    'CodonIndex','Frame','Codon','AA','RefPos','Base','Ratio'
+]
+HEADER_COMPACT = HEADER[:-2]
+FILTERED_HEADER = ['A_Count_Filtered','T_Count_Filtered','C_Count_Filtered','G_Count_Filtered','N_Count_Filtered']
+
+LAYOUTS = {
+    'long': ('_long.csv', HEADER),
+    'compact': ('_compact.csv', HEADER_COMPACT),
 }
 
-# Step 1: collect depth & ratios per (bam, ref, pos)
-depth = {}
-for bam in bam_files:
+BASES = ['A', 'T', 'C', 'G']
+
+# Rows of the count matrix. N holds N calls, deletions and ref-skips; OTHER
+# holds any other IUPAC code (part of the total, never written); LOWQ holds
+# bases dropped by the base-quality filter (marks the column as covered only).
+ROW_N, ROW_OTHER, ROW_LOWQ = 4, 5, 6
+# Quality-filtered A/T/C/G/N counts follow; they stay zero without a QualityFilter.
+ROW_FILTERED = 7
+N_FILTERED = 5
+N_ROWS = ROW_FILTERED + N_FILTERED
+
+# Same defaults as AlignmentFile.pileup()
+MIN_BASE_QUALITY = 13
+SKIP_FLAGS = 0x4 | 0x100 | 0x200 | 0x400  # unmapped, secondary, QC fail, duplicate
+
+BASE_LUT = np.full(256, ROW_OTHER, dtype=np.int64)
+for _i, _b in enumerate('ATCGN'):
+    BASE_LUT[ord(_b)] = _i
+
+# count row (A/T/C/G) -> codon_engine nucleotide code
+CONSENSUS_CODES = encode(''.join(BASES))
+
+# CIGAR op → consumes reference / consumes query / aligned base (M, =, X)
+CIGAR_REF = np.array([1, 0, 1, 1, 0, 0, 0, 1, 1, 0], dtype=np.int64)
+CIGAR_QUERY = np.array([1, 1, 0, 0, 1, 0, 0, 1, 1, 0], dtype=np.int64)
+CIGAR_ALIGNED = np.array([1, 0, 0, 0, 0, 0, 0, 1, 1, 0], dtype=bool)
+CIGAR_GAP = np.array([0, 0, 1, 1, 0, 0, 0, 0, 0, 0], dtype=bool)  # D, N
+
+READ_CHUNK = 4096
+
+
+class QualityFilter(NamedTuple):
+    """Thresholds for the filtered counts."""
+    min_base_quality: int = MIN_BASE_QUALITY
+    min_mapping_quality: int = 0
+
+
+class ContigCounts(NamedTuple):
+    """Counts for the covered positions of one contig in one BAM."""
+    bam: str
+    ref: str
+    positions: np.ndarray  # 1-based reference positions
+    counts: np.ndarray     # (N_ROWS, len(positions)) int64
+
+
+# -----------------------------------------
+# Counting backends
+# -----------------------------------------
+def iter_pileup(bam, ref, qfilter=None):
+    """Yield (position, count row) for every pileup column, in reference order."""
     with pysam.AlignmentFile(bam, "rb") as bf:
-        ref = bf.references[0]
         for col in bf.pileup(contig=ref):
             pos = col.pos + 1
             # counts
             counts = {'A':0,'T':0,'C':0,'G':0,'N':0}
+            filtered = [0] * N_FILTERED
             for pr in col.pileups:
-                if not pr.is_del and not pr.is_refskip and pr.query_position is not None:
+                is_base = not pr.is_del and not pr.is_refskip and pr.query_position is not None
+                if is_base:
                     b = pr.alignment.query_sequence[pr.query_position]
                     counts[b] = counts.get(b,0) + 1
                 else:
                     counts['N'] += 1
+
+                # mapping quality first: a failing read costs one comparison
+                if qfilter is None or pr.alignment.mapping_quality < qfilter.min_mapping_quality:
+                    continue
+                # deletions and ref-skips take the quality of the next query base
+                qpos = pr.query_position if is_base else pr.query_position_or_next
+                quals = pr.alignment.query_qualities
+                if qpos is None:
+                    continue
+                if quals is None:
+                    # No qualities ('*'): the array backend reads them as 0xff, which passes
+                    if qpos >= pr.alignment.query_length:
+                        continue
+                elif qpos >= len(quals) or quals[qpos] < qfilter.min_base_quality:
+                    continue
+                if not is_base:
+                    filtered[ROW_N] += 1
+                elif b in 'ATCGN':
+                    filtered['ATCGN'.index(b)] += 1
             total = sum(counts.values())
-            ratios = {b: (counts[b]/total if total>0 else 0) for b in counts}
-            depth[(bam,ref,pos)] = (counts, ratios)
-
-# Step 2: determine consensus base and group codons
-consensus = {}
-codons = defaultdict(lambda: [None,None,None])
-
-for (bam,ref,pos),(counts,ratios) in depth.items():
-    # consensus base (highest count among A,T,C,G)
-    maj = max(['A','T','C','G'], key=lambda x: counts[x])
-    consensus[(bam,ref,pos)] = maj
-    # assign into codon frames
-    idx   = (pos-1)//3 + 1
-    frame = (pos-1)%3
-    codons[(bam,ref,idx)][frame] = maj
-
-# Step 3: write long CSV
-out_fn = f"{meta_id}_long.csv"
-with open(out_fn, 'w', newline='') as fo:
-    w = csv.writer(fo)
-    w.writerow([
-        'MetaID','BAM','Reference','Position',
-        'A_Count','T_Count','C_Count','G_Count','N_Count',
-        'A_Ratio','T_Ratio','C_Ratio','G_Ratio','N_Ratio',
-        'CodonIndex','Frame','Codon','AA','RefPos','Base','Ratio'
-    ])
-    for (bam,ref,pos),(counts,ratios) in depth.items():
-        idx   = (pos-1)//3 + 1
-        frame = ((pos-1)%3) + 1
-        trip  = "".join(codons[(bam,ref,idx)][i] or 'N' for i in range(3))
-        aa    = codon_to_aa.get(trip, 'X')
-        refpos= f"{ref}-{pos}"
-        # emit one row per base
-        for base in ['A','T','C','G']:
-            w.writerow([
-                meta_id,
-                bam,
-                ref,
-                pos,
-                counts['A'], counts['T'], counts['C'], counts['G'], counts['N'],
-                ratios['A'], ratios['T'], ratios['C'], ratios['G'], ratios['N'],
-                idx,
-                frame,
-                trip,
-                aa,
-                refpos,
-                base,
-                ratios[base]
-            ])
-
-print(f"Wrote {out_fn}")
+            acgtn = [counts['A'], counts['T'], counts['C'], counts['G'], counts['N']]
+            yield pos, acgtn + [total - sum(acgtn), 0] + filtered
+
+
+def count_pileup(bam, ref, qfilter=None):
+    """Original backend: walk every pileup column and every read in Python."""
+    positions, rows = [], []
+    for pos, row in iter_pileup(bam, ref, qfilter):
+        positions.append(pos)
+        rows.append(row)
+    counts = np.array(rows, dtype=np.int64).reshape(-1, N_ROWS).T
+    return ContigCounts(bam, ref, np.array(positions, dtype=np.int64), counts)
+
+
+def expand_ranges(starts, lengths):
+    """Concatenate range(s, s + n) for every (s, n) pair without a Python loop."""
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(total, dtype=np.int64)
+
+
+def _accumulate_chunk(acc, cigars, ref_starts, mapqs, seqs, quals, min_bq, qfilter):
+    """
+    Add one chunk of reads to the (N_ROWS, width) accumulator and return it,
+    widened when reads run past the end of the reference (as pileup reports).
+    """
+    n_ops = np.fromiter((len(c) for c in cigars), dtype=np.int64, count=len(cigars))
+    cig = np.concatenate([np.asarray(c, dtype=np.int64).reshape(-1, 2) for c in cigars])
+    ops, lens = cig[:, 0], cig[:, 1]
+    read_idx = np.repeat(np.arange(len(cigars)), n_ops)
+    first_op = np.cumsum(n_ops) - n_ops
+
+    # Per-op start on the reference and in the concatenated query, reset per read
+    ref_adv = CIGAR_REF[ops] * lens
+    qry_adv = CIGAR_QUERY[ops] * lens
+    ref_excl = np.cumsum(ref_adv) - ref_adv
+    qry_excl = np.cumsum(qry_adv) - qry_adv
+    seq_lens = np.fromiter((len(s) for s in seqs), dtype=np.int64, count=len(seqs))
+    seq_offsets = np.cumsum(seq_lens) - seq_lens
+    ref_start = ref_starts[read_idx] + ref_excl - ref_excl[first_op][read_idx]
+    qry_start = seq_offsets[read_idx] + qry_excl - qry_excl[first_op][read_idx]
+
+    aligned = CIGAR_ALIGNED[ops]
+    ref_pos = expand_ranges(ref_start[aligned], lens[aligned])
+    qry_pos = expand_ranges(qry_start[aligned], lens[aligned])
+    raw_rows = BASE_LUT[np.frombuffer(b"".join(seqs), dtype=np.uint8)[qry_pos]]
+    base_rows = raw_rows
+
+    gap = CIGAR_GAP[ops]
+    gap_pos = expand_ranges(ref_start[gap], lens[gap])
+    gap_rows = ROW_N
+
+    if min_bq > 0 or qfilter is not None:
+        qual = np.frombuffer(b"".join(quals), dtype=np.uint8)
+        base_q = qual[qry_pos]
+        # Like pileup, a deletion or ref-skip takes the quality of the next
+        # query base (0 when the read ends in the gap)
+        gap_next = qry_start[gap]
+        gap_in_read = gap_next < (seq_offsets + seq_lens)[read_idx[gap]]
+        gap_op_q = np.where(gap_in_read, qual[np.minimum(gap_next, len(qual) - 1)], 0)
+        gap_q = np.repeat(gap_op_q, lens[gap])
+    if min_bq > 0:
+        base_rows = np.where(base_q < min_bq, ROW_LOWQ, raw_rows)
+        gap_rows = np.where(gap_q < min_bq, ROW_LOWQ, ROW_N)
+
+    end = max(ref_pos.max(initial=-1), gap_pos.max(initial=-1)) + 1
+    if end > acc.shape[1]:
+        acc = np.pad(acc, ((0, 0), (0, end - acc.shape[1])))
+    ref_len = acc.shape[1]
+
+    parts = [base_rows * ref_len + ref_pos, gap_rows * ref_len + gap_pos]
+    if qfilter is not None:
+        # Reads failing the mapping quality are masked per CIGAR op, before
+        # looking at any of their bases
+        op_ok = (mapqs >= qfilter.min_mapping_quality)[read_idx]
+        keep = np.repeat(op_ok[aligned], lens[aligned])
+        keep &= (base_q >= qfilter.min_base_quality) & (raw_rows <= ROW_N)
+        gap_keep = np.repeat(op_ok[gap], lens[gap]) & (gap_q >= qfilter.min_base_quality)
+        parts.append((ROW_FILTERED + raw_rows[keep]) * ref_len + ref_pos[keep])
+        parts.append((ROW_FILTERED + ROW_N) * ref_len + gap_pos[gap_keep])
+
+    acc += np.bincount(np.concatenate(parts), minlength=acc.size).reshape(acc.shape)
+    return acc
+
+
+def count_array(bam, ref, qfilter=None, min_bq=MIN_BASE_QUALITY):
+    """Array backend: one pass over the reads, counts accumulated with NumPy."""
+    with pysam.AlignmentFile(bam, "rb") as bf:
+        acc = np.zeros((N_ROWS, bf.get_reference_length(ref)), dtype=np.int64)
+        cigars, ref_starts, mapqs, seqs, quals = [], [], [], [], []
+        for read in bf.fetch(ref):
+            if read.flag & SKIP_FLAGS or (read.is_paired and not read.is_proper_pair):
+                continue
+            seq = read.query_sequence
+            if seq is None or not read.cigartuples:
+                continue
+            cigars.append(read.cigartuples)
+            ref_starts.append(read.reference_start)
+            mapqs.append(read.mapping_quality)
+            seqs.append(seq.encode())
+            qual = read.query_qualities
+            quals.append(bytes(qual) if qual is not None else b"\xff" * len(seq))
+            if len(cigars) == READ_CHUNK:
+                acc = _accumulate_chunk(
+                    acc, cigars, np.array(ref_starts), np.array(mapqs), seqs, quals, min_bq, qfilter
+                )
+                cigars, ref_starts, mapqs, seqs, quals = [], [], [], [], []
+        if cigars:
+            acc = _accumulate_chunk(
+                acc, cigars, np.array(ref_starts), np.array(mapqs), seqs, quals, min_bq, qfilter
+            )
+
+    covered = np.flatnonzero(acc.sum(axis=0))
+    return ContigCounts(bam, ref, covered + 1, acc[:, covered])
+
+
+BACKENDS = {
+    'pileup': count_pileup,
+    'array': count_array,
+}
+
+
+# -----------------------------------------
+# Ratios, consensus and codons
+# -----------------------------------------
+def base_ratios(counts):
+    """Return (ratios for A/T/C/G/N, total depth) per position."""
+    total = counts[:ROW_LOWQ].sum(axis=0)
+    ratios = np.divide(
+        counts[:ROW_OTHER], total,
+        out=np.zeros((ROW_OTHER, counts.shape[1])), where=total > 0,
+    )
+    return ratios, total
+
+
+def consensus_codons(positions, counts):
+    """
+    Majority base per position (ties resolved A > T > C > G) arranged into
+    reference-frame codons. Uncovered positions count as 'N'.
+
+    Returns the codon string and amino acid for every position.
+    """
+    if len(positions) == 0:
+        return np.empty(0, dtype='<U3'), np.empty(0, dtype='<U1')
+    length = int(positions[-1])
+    length += (-length) % 3
+    consensus = np.full(length, CODE_INVALID, dtype=np.uint8)
+    consensus[positions - 1] = CONSENSUS_CODES[counts[:4].argmax(axis=0)]
+    codon_idx = (positions - 1) // 3
+    return codon_strings(consensus)[codon_idx], translate_codes(consensus)[codon_idx]
+
+
+def _emit(head, tail, ratios, layout, extra):
+    if layout == 'compact':
+        return [head + tail + extra]
+    return [head + tail + [base, ratios[b]] + extra for b, base in enumerate(BASES)]
+
+
+def output_header(layout='long', filtered=False):
+    return LAYOUTS[layout][1] + (FILTERED_HEADER if filtered else [])
+
+
+def long_rows(meta_id, contig, layout='long', filtered=False):
+    """Yield the output rows of every covered position of one contig."""
+    positions, counts = contig.positions, contig.counts
+    ratios, total = base_ratios(counts)
+    codons, aas = consensus_codons(positions, counts)
+
+    count_rows = counts[:ROW_OTHER].T.tolist()
+    ratio_rows = ratios.T.tolist()
+    for i in np.flatnonzero(total == 0):
+        ratio_rows[i] = [0] * ROW_OTHER
+    idx = ((positions - 1) // 3 + 1).tolist()
+    frame = ((positions - 1) % 3 + 1).tolist()
+    if filtered:
+        extra_rows = counts[ROW_FILTERED:].T.tolist()
+    else:
+        extra_rows = [[]] * len(positions)
+
+    for i, pos in enumerate(positions.tolist()):
+        head = [meta_id, contig.bam, contig.ref, pos] + count_rows[i] + ratio_rows[i]
+        tail = [idx[i], frame[i], codons[i], aas[i], f"{contig.ref}-{pos}"]
+        yield from _emit(head, tail, ratio_rows[i], layout, extra_rows[i])
+
+
+def contig_columns(meta_id, contig, layout='long', filtered=False):
+    """Column arrays for one contig, as used by the Parquet writer."""
+    positions, counts = contig.positions, contig.counts
+    ratios, _ = base_ratios(counts)
+    codons, aas = consensus_codons(positions, counts)
+    n = len(positions)
+    cols = {
+        'MetaID': np.full(n, meta_id),
+        'BAM': np.full(n, contig.bam),
+        'Reference': np.full(n, contig.ref),
+        'Position': positions,
+        'CodonIndex': (positions - 1) // 3 + 1,
+        'Frame': (positions - 1) % 3 + 1,
+        'Codon': codons,
+        'AA': aas,
+        'RefPos': np.char.add(f"{contig.ref}-", positions.astype(str)),
+    }
+    for i, base in enumerate(BASES + ['N']):
+        cols[f"{base}_Count"] = counts[i]
+        cols[f"{base}_Ratio"] = ratios[i]
+        if filtered:
+            cols[f"{base}_Count_Filtered"] = counts[ROW_FILTERED + i]
+    if layout == 'compact':
+        return cols
+    cols = {name: np.repeat(col, len(BASES)) for name, col in cols.items()}
+    cols['Base'] = np.tile(BASES, n)
+    cols['Ratio'] = ratios[:len(BASES)].T.ravel()
+    return cols
+
+
+def window_rows(meta_id, bam, ref, window, layout='long', filtered=False):
+    """Rows for one codon window, given its covered (position, count row) pairs."""
+    frames = ['N', 'N', 'N']
+    for pos, row in window:
+        acgt = row[:4]
+        frames[(pos - 1) % 3] = BASES[acgt.index(max(acgt))]
+    trip = ''.join(frames)
+    aa = codon_to_aa.get(trip, 'X')
+
+    rows = []
+    for pos, row in window:
+        total = sum(row[:ROW_LOWQ])
+        ratios = [c / total for c in row[:ROW_OTHER]] if total > 0 else [0] * ROW_OTHER
+        head = [meta_id, bam, ref, pos] + row[:ROW_OTHER] + ratios
+        tail = [(pos - 1) // 3 + 1, (pos - 1) % 3 + 1, trip, aa, f"{ref}-{pos}"]
+        rows.extend(_emit(head, tail, ratios, layout, row[ROW_FILTERED:] if filtered else []))
+    return rows
+
+
+def stream_rows(meta_id, bam, ref, records, layout='long', filtered=False):
+    """
+    Consume (position, count row) records in reference order and yield rows
+    one codon window at a time, so only the current window is buffered.
+    """
+    window, window_idx = [], None
+    for pos, row in records:
+        idx = (pos - 1) // 3
+        if idx != window_idx and window:
+            yield from window_rows(meta_id, bam, ref, window, layout, filtered)
+            window = []
+        window_idx = idx
+        window.append((pos, row))
+    if window:
+        yield from window_rows(meta_id, bam, ref, window, layout, filtered)
+
+
+def contig_records(contig):
+    """(position, count row) records from an already counted contig."""
+    return zip(contig.positions.tolist(), contig.counts.T.tolist())
+
+
+def contig_track(contig, length):
+    """Total depth of one counted contig at every position of the reference."""
+    return depth_tracks.depth_track(contig.positions, contig.counts[:ROW_LOWQ].sum(axis=0), length)
+
+
+def contig_rle(meta_id, contig, length, breaks=depth_tracks.DEPTH_BREAKS):
+    """Run-length encoded depth track rows of one counted contig."""
+    track = contig_track(contig, length)
+    return depth_tracks.rle_rows(meta_id, contig.ref, len(track), *depth_tracks.track_runs(track, breaks))
+
+
+def contig_pyramid(meta_id, contig, length, bins=depth_tracks.PYRAMID_BINS):
+    """Depth pyramid rows of one counted contig."""
+    return depth_tracks.pyramid_rows(meta_id, contig.ref, contig_track(contig, length), bins)
+
+
+def tee_depth(records, *sinks):
+    """Pass (position, count row) records through, adding their depth to each sink (DepthRuns, DepthTrack)."""
+    for pos, row in records:
+        depth = sum(row[:ROW_LOWQ])
+        for sink in sinks:
+            sink.add(pos, depth)
+        yield pos, row
+
+
+def reference_lengths(bam_files):
+    """(BAM, contig) -> reference length from the BAM headers."""
+    lengths = {}
+    for bam in bam_files:
+        with pysam.AlignmentFile(bam, "rb") as bf:
+            lengths.update(((bam, ref), length) for ref, length in zip(bf.references, bf.lengths))
+    return lengths
+
+
+def work_units(bam_files):
+    """(BAM, contig) pairs in a fixed order: sorted BAM names, header contig order."""
+    units = []
+    for bam in sorted(bam_files):
+        with pysam.AlignmentFile(bam, "rb") as bf:
+            units.extend((bam, ref) for ref in bf.references)
+    return units
+
+
+def _count_unit(task):
+    backend, bam, ref, qfilter = task
+    return BACKENDS[backend](bam, ref, qfilter)
+
+
+def count_all(units, backend, threads=1, qfilter=None):
+    """Count every work unit, in parallel when threads > 1; yields results in unit order."""
+    tasks = [(backend, bam, ref, qfilter) for bam, ref in units]
+    if threads <= 1 or len(tasks) <= 1:
+        yield from map(_count_unit, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=min(threads, len(tasks))) as pool:
+        yield from pool.map(_count_unit, tasks)
+
+
+def write_tsv(out_fn, header, rows):
+    with open(out_fn, 'w', newline='') as fo:
+        w = csv.writer(fo, delimiter='\t')
+        w.writerow(header)
+        w.writerows(rows)
+    print(f"Wrote {out_fn}")
+
+
+def write_tracks(meta_id, rle, pyramid, args):
+    if args.rle:
+        write_tsv(f"{meta_id}_depth_rle.tsv", depth_tracks.RLE_HEADER, rle)
+    if args.pyramid:
+        write_tsv(f"{meta_id}_depth_pyramid.tsv", depth_tracks.PYRAMID_HEADER, pyramid)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-position base counts and codons from IRMA BAM files")
+    parser.add_argument("meta_id", help="Sample ID, used for the MetaID column and output name")
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKENDS),
+        default='pileup',
+        help="Counting backend (default: pileup)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=1,
+        help="Worker processes for (BAM, contig) work units (default: 1)",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=sorted(LAYOUTS),
+        default='long',
+        help="long: four rows per position; compact: one row per position (default: long)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write each codon window as soon as it is complete (bounded memory)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=['csv', 'parquet'],
+        default='csv',
+        help="csv: <META_ID>_long.csv / _compact.csv; parquet: <META_ID>_depth.parquet dataset (default: csv)",
+    )
+    parser.add_argument(
+        "--min-base-quality",
+        type=int,
+        default=None,
+        help="Base quality for the filtered counts (values below 13 behave as 13)",
+    )
+    parser.add_argument(
+        "--min-mapping-quality",
+        type=int,
+        default=None,
+        help="Mapping quality for the filtered counts",
+    )
+    parser.add_argument(
+        "--rle",
+        action="store_true",
+        help="Also write run-length encoded depth tracks to <META_ID>_depth_rle.tsv (see depth_tracks.py)",
+    )
+    parser.add_argument(
+        "--rle-breaks",
+        default=','.join(map(str, depth_tracks.DEPTH_BREAKS)),
+        help="Comma-separated depth classes of the RLE tracks (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pyramid",
+        action="store_true",
+        help="Also write binned depth summaries to <META_ID>_depth_pyramid.tsv (see depth_tracks.py)",
+    )
+    parser.add_argument(
+        "--pyramid-bins",
+        default=','.join(map(str, depth_tracks.PYRAMID_BINS)),
+        help="Comma-separated bin widths of the depth pyramid (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    bam_files = glob.glob("*.bam")
+    units = work_units(bam_files)
+    lengths = reference_lengths(bam_files) if args.rle or args.pyramid else {}
+    breaks = depth_tracks.parse_breaks(args.rle_breaks)
+    bins = depth_tracks.parse_bins(args.pyramid_bins)
+    rle, pyramid = [], []
+    qfilter = None
+    if args.min_base_quality is not None or args.min_mapping_quality is not None:
+        qfilter = QualityFilter(
+            max(args.min_base_quality or 0, MIN_BASE_QUALITY),
+            args.min_mapping_quality or 0,
+        )
+    filtered = qfilter is not None
+
+    if args.format == 'parquet':
+        import depth_parquet
+
+        out_dir = f"{args.meta_id}_depth.parquet"
+        for i, contig in enumerate(count_all(units, args.backend, args.threads, qfilter)):
+            table = depth_parquet.to_table(contig_columns(args.meta_id, contig, args.layout, filtered), args.layout)
+            depth_parquet.write(table, out_dir, f"{args.meta_id}-{i}")
+            if args.rle:
+                rle.extend(contig_rle(args.meta_id, contig, lengths[contig.bam, contig.ref], breaks))
+            if args.pyramid:
+                pyramid.extend(contig_pyramid(args.meta_id, contig, lengths[contig.bam, contig.ref], bins))
+        print(f"Wrote {out_dir}")
+        write_tracks(args.meta_id, rle, pyramid, args)
+        return
+
+    suffix = LAYOUTS[args.layout][0]
+    out_fn = f"{args.meta_id}{suffix}"
+    with open(out_fn, 'w', newline='') as fo:
+        w = csv.writer(fo)
+        w.writerow(output_header(args.layout, filtered))
+        if args.stream and args.backend == 'pileup':
+            # Pileup columns are streamed straight from the BAM, one unit at a time
+            for bam, ref in units:
+                depth_runs, depth_track = depth_tracks.DepthRuns(breaks), depth_tracks.DepthTrack()
+                sinks = [depth_runs] * args.rle + [depth_track] * args.pyramid
+                records = tee_depth(iter_pileup(bam, ref, qfilter), *sinks)
+                w.writerows(stream_rows(args.meta_id, bam, ref, records, args.layout, filtered))
+                if args.rle:
+                    runs = depth_runs.finish(lengths[bam, ref])
+                    length = runs[-1][1] if runs else 0
+                    rle.extend([args.meta_id, ref, length, *run] for run in runs)
+                if args.pyramid:
+                    track = depth_track.finish(lengths[bam, ref])
+                    pyramid.extend(depth_tracks.pyramid_rows(args.meta_id, ref, track, bins))
+        elif args.stream:
+            for contig in count_all(units, args.backend, args.threads, qfilter):
+                records = contig_records(contig)
+                w.writerows(stream_rows(args.meta_id, contig.bam, contig.ref, records, args.layout, filtered))
+                if args.rle:
+                    rle.extend(contig_rle(args.meta_id, contig, lengths[contig.bam, contig.ref], breaks))
+                if args.pyramid:
+                    pyramid.extend(contig_pyramid(args.meta_id, contig, lengths[contig.bam, contig.ref], bins))
+        else:
+            for contig in count_all(units, args.backend, args.threads, qfilter):
+                w.writerows(long_rows(args.meta_id, contig, args.layout, filtered))
+                if args.rle:
+                    rle.extend(contig_rle(args.meta_id, contig, lengths[contig.bam, contig.ref], breaks))
+                if args.pyramid:
+                    pyramid.extend(contig_pyramid(args.meta_id, contig, lengths[contig.bam, contig.ref], bins))
+
+    print(f"Wrote {out_fn}")
+    write_tracks(args.meta_id, rle, pyramid, args)
+
+
+if __name__ == "__main__":
+    main()
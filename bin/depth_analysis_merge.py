@@ -1,34 +1,188 @@
-import pandas as pd
+#!/usr/bin/env python3
+"""
+Merge the per-sample depth tables from depth_analysis.py into one run report.
+
+  csv     – every *.csv in the working directory concatenated into depth_report.csv
+            (with --stream: copied straight through, see below)
+  parquet – every *.csv and *_depth.parquet dataset in the working directory
+            written to a depth_report.parquet dataset partitioned by sample
+            and segment (see depth_parquet.py)
+
+--stream copies each input to the output in sorted file order with a single
+header, in fixed-size blocks, so memory use does not depend on the number or
+size of the inputs. Every input must have exactly the same header line.
+--compress gzip|zstd compresses the streamed report (zstd needs the
+zstandard package).
+
+--pyramid instead streams every <META_ID>_depth_pyramid.tsv from
+depth_analysis.py --pyramid into depth_pyramid.tsv, the run's depth at
+every resolution in one file (--compress applies as well).
+"""
+import argparse
 import glob
+import gzip
+import os
 import sys
 
-# MERGE ALL DATA
-# Get a list of all CSV files in the current directory
-csv_files = glob.glob('*.csv')
-
-# Initialize an empty DataFrame to store the merged data
-merged_data = pd.DataFrame()
-
-# Check if there are any CSV files found
-if not csv_files:
-    print("No CSV files found in the current directory.")
-    sys.exit(1)
-
-# Iterate over each CSV file and concatenate them into one DataFrame
-for file in csv_files:
-    try:
-        # Read the CSV file into a DataFrame
-        df = pd.read_csv(file)
-
-        # Concatenate with the merged_data DataFrame
-        merged_data = pd.concat([merged_data, df], axis=0, ignore_index=True)
-    except Exception as e:
-        print(f"Error reading {file}: {e}")
-        continue
-
-# Write the merged data to a new CSV file if there is any data
-if not merged_data.empty:
-    merged_data.to_csv('depth_report.csv', index=False)
-    print("Merged CSV file created: depth_report.csv")
-else:
-    print("No data found to merge.")
+import pandas as pd
+
+
+def merge_csv(csv_files):
+    # Initialize an empty DataFrame to store the merged data
+    merged_data = pd.DataFrame()
+
+    # Iterate over each CSV file and concatenate them into one DataFrame
+    for file in csv_files:
+        try:
+            # Read the CSV file into a DataFrame
+            df = pd.read_csv(file)
+
+            # Concatenate with the merged_data DataFrame
+            merged_data = pd.concat([merged_data, df], axis=0, ignore_index=True)
+        except Exception as e:
+            print(f"Error reading {file}: {e}")
+            continue
+
+    # Write the merged data to a new CSV file if there is any data
+    if not merged_data.empty:
+        merged_data.to_csv('depth_report.csv', index=False)
+        print("Merged CSV file created: depth_report.csv")
+    else:
+        print("No data found to merge.")
+
+
+COPY_BLOCK = 1 << 20
+
+SUFFIXES = {
+    'none': '',
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+
+def open_output(path, compress):
+    if compress == 'gzip':
+        return gzip.open(path, 'wb')
+    if compress == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            sys.exit("zstd compression requires the 'zstandard' package")
+        return zstandard.ZstdCompressor().stream_writer(open(path, 'wb'), closefd=True)
+    return open(path, 'wb')
+
+
+def merge_csv_stream(csv_files, compress='none', out_fn='depth_report.csv'):
+    """Concatenate CSVs byte for byte under one header, in constant memory."""
+    out_fn += SUFFIXES[compress]
+    header, header_file, written = None, None, 0
+
+    with open_output(out_fn, compress) as out:
+        for file in sorted(csv_files):
+            with open(file, 'rb') as fi:
+                line = fi.readline()
+                if not line:
+                    print(f"Skipping empty file {file}")
+                    continue
+                line = line.rstrip(b'\r\n')
+                if header is None:
+                    header, header_file = line, file
+                    out.write(header + b'\n')
+                elif line != header:
+                    out.close()
+                    os.remove(out_fn)
+                    sys.exit(
+                        f"Schema mismatch: {file} header differs from {header_file}\n"
+                        f"  expected: {header.decode(errors='replace')}\n"
+                        f"  found:    {line.decode(errors='replace')}"
+                    )
+                last = b'\n'
+                while True:
+                    block = fi.read(COPY_BLOCK)
+                    if not block:
+                        break
+                    out.write(block)
+                    last = block[-1:]
+                if last != b'\n':
+                    out.write(b'\n')
+                written += 1
+
+    if written:
+        print(f"Merged {written} files into {out_fn}")
+    else:
+        os.remove(out_fn)
+        print("No data found to merge.")
+
+
+def merge_parquet(csv_files, parquet_dirs, out_dir='depth_report.parquet'):
+    import depth_parquet
+
+    for file in csv_files:
+        try:
+            depth_parquet.write_csv(file, out_dir, os.path.splitext(os.path.basename(file))[0])
+        except Exception as e:
+            print(f"Error reading {file}: {e}")
+            continue
+
+    if parquet_dirs:
+        depth_parquet.write(depth_parquet.open_dataset(parquet_dirs), out_dir, 'merged')
+
+    if os.path.isdir(out_dir):
+        print(f"Merged Parquet dataset created: {out_dir}")
+    else:
+        print("No data found to merge.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge per-sample depth tables into one report")
+    parser.add_argument(
+        "--format",
+        choices=['csv', 'parquet'],
+        default='csv',
+        help="Output format (default: csv)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream CSV inputs straight to the output (constant memory, identical headers required)",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=sorted(SUFFIXES),
+        default='none',
+        help="Compression of the streamed CSV report (default: none)",
+    )
+    parser.add_argument(
+        "--pyramid",
+        action="store_true",
+        help="Merge the *_depth_pyramid.tsv depth pyramids into depth_pyramid.tsv",
+    )
+    args = parser.parse_args()
+
+    if args.pyramid:
+        pyramid_files = glob.glob('*_depth_pyramid.tsv')
+        if not pyramid_files:
+            print("No depth pyramids found in the current directory.")
+            sys.exit(1)
+        merge_csv_stream(pyramid_files, args.compress, 'depth_pyramid.tsv')
+        return
+
+    # Get a list of all depth tables in the current directory
+    csv_files = [f for f in glob.glob('*.csv') if not f.startswith('depth_report.csv')]
+    parquet_dirs = [d for d in glob.glob('*_depth.parquet') if os.path.isdir(d)]
+
+    # Check if there are any inputs found
+    if not csv_files and not (args.format == 'parquet' and parquet_dirs):
+        print("No CSV files found in the current directory.")
+        sys.exit(1)
+
+    if args.format == 'parquet':
+        merge_parquet(csv_files, parquet_dirs)
+    elif args.stream:
+        merge_csv_stream(csv_files, args.compress)
+    else:
+        merge_csv(csv_files)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Parquet layout for the depth / base-ratio tables.
+
+Shared by depth_analysis.py (per-sample output) and depth_analysis_merge.py
+(run-level output). Datasets are hive-partitioned by sample and segment:
+
+    <root>/MetaID=<sample>/Segment=<segment>/<part>.parquet
+
+String columns are dictionary encoded and counts/positions are stored as
+typed integers, so a single segment across a whole run can be read with e.g.
+
+    pyarrow.dataset.dataset(root, partitioning='hive').to_table(filter=ds.field('Segment') == 'HA')
+
+pyarrow is only imported by the scripts when Parquet output is requested.
+"""
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+
+from segments import segment_of
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('MetaID', pa.string()), ('Segment', pa.string())]),
+    flavor='hive',
+)
+
+DICT = pa.dictionary(pa.int32(), pa.string())
+
+LONG_SCHEMA = pa.schema([
+    ('MetaID', pa.string()),
+    ('Segment', pa.string()),
+    ('BAM', DICT),
+    ('Reference', DICT),
+    ('Position', pa.int32()),
+    ('A_Count', pa.int32()),
+    ('T_Count', pa.int32()),
+    ('C_Count', pa.int32()),
+    ('G_Count', pa.int32()),
+    ('N_Count', pa.int32()),
+    ('A_Ratio', pa.float64()),
+    ('T_Ratio', pa.float64()),
+    ('C_Ratio', pa.float64()),
+    ('G_Ratio', pa.float64()),
+    ('N_Ratio', pa.float64()),
+    ('CodonIndex', pa.int32()),
+    ('Frame', pa.int8()),
+    ('Codon', DICT),
+    ('AA', DICT),
+    ('RefPos', pa.string()),
+    ('Base', DICT),
+    ('Ratio', pa.float64()),
+])
+
+COMPACT_SCHEMA = pa.schema([f for f in LONG_SCHEMA if f.name not in ('Base', 'Ratio')])
+
+SCHEMAS = {
+    'long': LONG_SCHEMA,
+    'compact': COMPACT_SCHEMA,
+}
+
+# Appended when depth_analysis.py ran with quality filters
+FILTERED_FIELDS = [pa.field(f"{b}_Count_Filtered", pa.int32()) for b in 'ATCGN']
+
+
+def schema_for(layout: str = 'long', filtered: bool = False) -> pa.Schema:
+    schema = SCHEMAS[layout]
+    if filtered:
+        for field in FILTERED_FIELDS:
+            schema = schema.append(field)
+    return schema
+
+
+def _as_array(values, type_) -> pa.Array:
+    if isinstance(values, pa.Array):
+        return values.cast(type_)
+    return pa.array(values, type=type_)
+
+
+def to_table(columns: dict, layout: str = 'long') -> pa.Table:
+    """
+    Build a typed, dictionary-encoded table from a dict of column arrays
+    (NumPy arrays, lists or Arrow arrays). Segment is derived from Reference
+    when it is not given.
+    """
+    schema = schema_for(layout, FILTERED_FIELDS[0].name in columns)
+    columns = dict(columns)
+    if 'Segment' not in columns:
+        refs = _as_array(columns['Reference'], pa.string()).dictionary_encode()
+        segments = pa.array([segment_of(r) for r in refs.dictionary.to_pylist()], type=pa.string())
+        columns['Segment'] = segments.take(refs.indices)
+    arrays = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            arrays.append(_as_array(columns[field.name], pa.string()).dictionary_encode())
+        else:
+            arrays.append(_as_array(columns[field.name], field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def encode_batches(batches, layout: str = 'long'):
+    """Apply the Parquet schema (and add Segment) to CSV record batches."""
+    for batch in batches:
+        columns = {name: batch.column(i) for i, name in enumerate(batch.schema.names)}
+        yield from to_table(columns, layout).to_batches()
+
+
+def detect_layout(names) -> str:
+    return 'long' if 'Base' in names else 'compact'
+
+
+def write(data, root: str, basename: str, schema: pa.Schema = None) -> None:
+    """Write a table, dataset or batch iterator into the partitioned dataset at root."""
+    ds.write_dataset(
+        data,
+        root,
+        schema=schema,
+        format='parquet',
+        partitioning=PARTITIONING,
+        basename_template=f"{basename}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+    )
+
+
+def write_csv(path: str, root: str, basename: str) -> None:
+    """Stream a depth CSV into the partitioned dataset, batch by batch."""
+    string_cols = ['MetaID', 'BAM', 'Reference', 'Codon', 'AA', 'RefPos', 'Base']
+    reader = pacsv.open_csv(
+        path,
+        convert_options=pacsv.ConvertOptions(column_types={c: pa.string() for c in string_cols}),
+    )
+    names = reader.schema.names
+    schema = schema_for(detect_layout(names), FILTERED_FIELDS[0].name in names)
+    write(encode_batches(reader, detect_layout(names)), root, basename, schema=schema)
+
+
+def open_dataset(paths):
+    """Open one or more partitioned depth datasets as a single dataset."""
+    return ds.dataset([ds.dataset(p, format='parquet', partitioning=PARTITIONING) for p in paths])
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Run-length encoded depth tracks.
+
+A track covers every position of a reference (1-based, uncovered positions
+have depth 0). Depth is reduced to a class, the largest of DEPTH_BREAKS at
+or below it, and consecutive positions of the same class form one run, so a
+segment is usually a handful of rows:
+
+    MetaID  Reference  Length  Start  End   Depth
+    S1      A_HA_H3    1701    1      22    1
+    S1      A_HA_H3    1701    23     1650  1000
+    S1      A_HA_H3    1701    1651   1701  0
+
+Depth here is the depth_analysis.py total (A/T/C/G/N and other calls,
+deletions and ref-skips, without low-quality bases). depth_analysis.py
+--rle writes these tracks as <META_ID>_depth_rle.tsv; dropout_regions.py
+reads them back. A threshold that is one of the breaks splits a track
+exactly: a run is below it when its Depth class is.
+
+Depth pyramids summarise the same track at several resolutions in one
+table, for plotting without the per-position CSVs. Each level bins the
+track into consecutive windows of PYRAMID_BINS positions (the last window
+of a reference may be shorter), plus one 'segment' row per reference:
+
+    MetaID  Reference  Length  Resolution  Start  End   Mean    Min  Max
+    S1      A_HA_H3    1701    1           1      1     0       0    0
+    ...
+    S1      A_HA_H3    1701    100         1      100   412.57  0    871
+    S1      A_HA_H3    1701    segment     1      1701  933.2   0    1544
+
+Resolution-1 rows are the per-position depth (Mean = Min = Max).
+depth_analysis.py --pyramid writes them as <META_ID>_depth_pyramid.tsv and
+depth_analysis_merge.py --pyramid concatenates a run into depth_pyramid.tsv.
+"""
+import numpy as np
+
+DEPTH_BREAKS = [0, 1, 10, 20, 50, 100, 1000]
+RLE_HEADER = ['MetaID', 'Reference', 'Length', 'Start', 'End', 'Depth']
+PYRAMID_BINS = [1, 10, 100]
+PYRAMID_HEADER = ['MetaID', 'Reference', 'Length', 'Resolution', 'Start', 'End', 'Mean', 'Min', 'Max']
+
+
+def parse_breaks(text):
+    """Sorted depth breaks from '1,10,20'; 0 is always the first break."""
+    return sorted({0, *(int(b) for b in str(text).split(',') if b.strip())})
+
+
+def parse_bins(text):
+    """Sorted, positive pyramid bin widths from '1,10,100'."""
+    bins = sorted({int(b) for b in str(text).split(',') if b.strip()})
+    if not bins or bins[0] < 1:
+        raise ValueError(f"Bin widths must be positive: {text}")
+    return bins
+
+
+def depth_track(positions, depth, length=0):
+    """Depth at every position 1..max(length, last covered position)."""
+    end = max(int(length), int(positions[-1]) if len(positions) else 0)
+    track = np.zeros(end, dtype=np.int64)
+    track[np.asarray(positions, dtype=np.int64) - 1] = depth
+    return track
+
+
+def depth_class(depth, breaks=DEPTH_BREAKS):
+    """The largest break at or below each depth (breaks start at 0, see parse_breaks)."""
+    breaks = np.asarray(breaks, dtype=np.int64)
+    return breaks[np.searchsorted(breaks, depth, side='right') - 1]
+
+
+def runs(values):
+    """(starts, ends, values) of the runs of equal values, starts/ends 1-based inclusive."""
+    values = np.asarray(values)
+    if values.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), values
+    change = np.flatnonzero(values[1:] != values[:-1]) + 1
+    starts = np.concatenate([[0], change])
+    ends = np.concatenate([change, [values.size]])
+    return starts + 1, ends, values[starts]
+
+
+def track_runs(track, breaks=DEPTH_BREAKS):
+    """Runs of equal depth class of a depth track."""
+    return runs(depth_class(track, breaks))
+
+
+def rle_rows(meta_id, ref, length, starts, ends, classes):
+    return [[meta_id, ref, length, s, e, c] for s, e, c in zip(starts.tolist(), ends.tolist(), classes.tolist())]
+
+
+def binned(track, width):
+    """(starts, ends, mean, min, max) of consecutive windows of width positions, starts/ends 1-based."""
+    starts = np.arange(0, track.size, width)
+    ends = np.minimum(starts + width, track.size)
+    if track.size == 0:
+        return starts, ends, np.empty(0), track, track
+    mean = np.add.reduceat(track, starts) / (ends - starts)
+    return starts + 1, ends, mean.round(2), np.minimum.reduceat(track, starts), np.maximum.reduceat(track, starts)
+
+
+def pyramid_rows(meta_id, ref, track, bins=PYRAMID_BINS):
+    """Pyramid rows of one depth track: each bin width in turn, then the whole segment."""
+    length = len(track)
+    rows = []
+    for width, level in [*((b, str(b)) for b in bins), (max(length, 1), 'segment')]:
+        starts, ends, mean, low, high = binned(track, width)
+        if width == 1:
+            mean = track
+        rows.extend(
+            [meta_id, ref, length, level, s, e, m, lo, hi]
+            for s, e, m, lo, hi in zip(starts.tolist(), ends.tolist(), mean.tolist(), low.tolist(), high.tolist())
+        )
+    return rows
+
+
+class DepthTrack:
+    """
+    Collects (position, depth) pairs arriving in reference order and builds
+    their depth_track, for the streaming paths of depth_analysis.py.
+    """
+
+    def __init__(self):
+        self.positions = []
+        self.depths = []
+
+    def add(self, pos, depth):
+        self.positions.append(pos)
+        self.depths.append(depth)
+
+    def finish(self, length=0):
+        return depth_track(self.positions, self.depths, length)
+
+
+class DepthRuns:
+    """
+    Builds the same runs as track_runs from (position, depth) pairs arriving
+    in reference order, for the streaming paths of depth_analysis.py.
+    """
+
+    def __init__(self, breaks=DEPTH_BREAKS):
+        self.breaks = list(breaks)
+        self.rows = []
+        self._start = self._last = 0
+        self._class = None
+
+    def _extend(self, pos, cls):
+        if cls != self._class:
+            if self._class is not None:
+                self.rows.append((self._start, self._last, self._class))
+            self._start, self._class = pos, cls
+        self._last = pos
+
+    def add(self, pos, depth):
+        if pos > self._last + 1:
+            self._extend(self._last + 1, self.breaks[0])
+            self._last = pos - 1
+        cls = self.breaks[0]
+        for b in self.breaks:
+            if b > depth:
+                break
+            cls = b
+        self._extend(pos, cls)
+
+    def finish(self, length=0):
+        """All runs, with uncovered positions up to length appended as class 0."""
+        if length > self._last:
+            self._extend(self._last + 1, self.breaks[0])
+            self._last = length
+        if self._class is not None:
+            self.rows.append((self._start, self._last, self._class))
+            self._class = None
+        return self.rows
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Dropout regions of a run from the run-length encoded depth tracks written
+by depth_analysis.py --rle (<META_ID>_depth_rle.tsv, see depth_tracks.py).
+
+Adjacent runs with a depth class below --threshold are merged into gaps.
+The threshold should be one of the track's depth breaks (the default 10
+is) so that the classes split the positions exactly. Gaps shorter than
+--min-length are dropped.
+
+Outputs:
+  <prefix>_regions.tsv     – Sample, Segment, Reference, Start, End, Bases, Kind
+                             (Kind: start / end of the segment, internal, or
+                             segment when nothing reaches the threshold)
+  <prefix>_recurrence.tsv  – Reference, Segment, Start, End, Samples, Total,
+                             Fraction: stretches of a reference where at least
+                             --min-samples samples have a gap (Total samples
+                             have that reference), e.g. a failing primer
+
+Positions are those of the IRMA reference, so recurrence is counted per
+reference (A_HA_H3 and A_HA_H1 separately).
+
+Usage: python dropout_regions.py [RLE_TSV ...] [--threshold 10] [--min-length 1]
+                                 [--min-samples 2] [--prefix dropout]
+"""
+import argparse
+import glob
+
+import numpy as np
+import pandas as pd
+
+from depth_tracks import runs
+from segments import segments_of
+
+REGION_COLUMNS = ['Sample', 'Segment', 'Reference', 'Start', 'End', 'Bases', 'Kind']
+RECURRENCE_COLUMNS = ['Reference', 'Segment', 'Start', 'End', 'Samples', 'Total', 'Fraction']
+
+
+def read_tracks(paths):
+    frames = [pd.read_csv(path, sep='\t', dtype={'MetaID': str, 'Reference': str}) for path in paths]
+    if not frames:
+        return pd.DataFrame(columns=['MetaID', 'Reference', 'Length', 'Start', 'End', 'Depth'])
+    return pd.concat(frames, ignore_index=True).sort_values(['MetaID', 'Reference', 'Start'], kind='stable')
+
+
+def gap_regions(tracks, threshold=10, min_length=1):
+    """Merged runs below threshold, one row per gap."""
+    below = (tracks['Depth'] < threshold).to_numpy()
+    key = tracks['MetaID'] + '\t' + tracks['Reference']
+    continues = below & np.r_[False, below[:-1]] & (key == key.shift()).to_numpy()
+    gaps = tracks[below].assign(Gap=np.cumsum(below & ~continues)[below])
+    gaps = gaps.groupby('Gap', sort=False).agg(
+        Sample=('MetaID', 'first'), Reference=('Reference', 'first'),
+        Start=('Start', 'min'), End=('End', 'max'), Length=('Length', 'first'),
+    )
+    gaps['Bases'] = gaps['End'] - gaps['Start'] + 1
+    gaps = gaps[gaps['Bases'] >= min_length]
+
+    at_start, at_end = gaps['Start'] == 1, gaps['End'] == gaps['Length']
+    gaps['Kind'] = np.select([at_start & at_end, at_start, at_end], ['segment', 'start', 'end'], 'internal')
+    gaps['Segment'] = segments_of(gaps['Reference'])
+    return gaps[REGION_COLUMNS].reset_index(drop=True)
+
+
+def recurrence(tracks, gaps, min_samples=2):
+    """Stretches of each reference where at least min_samples samples have a gap."""
+    totals = tracks.drop_duplicates(['MetaID', 'Reference']).groupby('Reference').size()
+    lengths = tracks.groupby('Reference')['Length'].max()
+    rows = []
+    for ref, ref_gaps in gaps.groupby('Reference', sort=True):
+        events = np.zeros(int(lengths[ref]) + 2, dtype=np.int64)
+        np.add.at(events, ref_gaps['Start'].to_numpy(), 1)
+        np.add.at(events, ref_gaps['End'].to_numpy() + 1, -1)
+        starts, ends, samples = runs(np.cumsum(events)[1:-1])
+        keep = samples >= min_samples
+        rows.append(pd.DataFrame({
+            'Reference': ref,
+            'Start': starts[keep],
+            'End': ends[keep],
+            'Samples': samples[keep],
+            'Total': totals[ref],
+        }))
+    if not rows:
+        return pd.DataFrame(columns=RECURRENCE_COLUMNS)
+    table = pd.concat(rows, ignore_index=True)
+    table['Segment'] = segments_of(table['Reference'])
+    table['Fraction'] = (table['Samples'] / table['Total']).round(3)
+    return table[RECURRENCE_COLUMNS]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dropout regions and their recurrence from RLE depth tracks")
+    parser.add_argument("inputs", nargs='*', help="RLE depth tracks (default: *_depth_rle.tsv)")
+    parser.add_argument("--threshold", type=int, default=10, help="Gaps have depth below this (default: 10)")
+    parser.add_argument("--min-length", type=int, default=1, help="Shortest gap reported, in bases (default: 1)")
+    parser.add_argument(
+        "--min-samples",
+        type=int,
+        default=2,
+        help="Samples sharing a gap for a recurrence row (default: 2)",
+    )
+    parser.add_argument("--prefix", default='dropout', help="Output prefix (default: dropout)")
+    args = parser.parse_args()
+
+    tracks = read_tracks(args.inputs or sorted(glob.glob('*_depth_rle.tsv')))
+    gaps = gap_regions(tracks, args.threshold, args.min_length)
+    recurring = recurrence(tracks, gaps, args.min_samples)
+
+    gaps.to_csv(f"{args.prefix}_regions.tsv", sep='\t', index=False)
+    recurring.to_csv(f"{args.prefix}_recurrence.tsv", sep='\t', index=False)
+    print(f"{len(gaps)} gaps in {gaps['Sample'].nunique()} samples written to {args.prefix}_regions.tsv, "
+          f"{len(recurring)} recurring stretches to {args.prefix}_recurrence.tsv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Small bytes-based FASTA / FASTQ reader for the bin/ scripts.
+
+Records come back as bytes, (id, sequence) for FASTA and (id, sequence,
+quality) for FASTQ, where id is the first word of the header as in
+Bio.SeqIO. No SeqRecord objects are built and nothing outside the standard
+library is imported.
+
+Input may be a plain file, a gzip file (detected from its magic bytes) or '-'
+for stdin, read in CHUNK-sized blocks so large inputs are streamed. With
+mmap=True a plain file is memory-mapped instead, which skips the block
+buffering; records are copied out of the mapping as bytes, and the mapping is
+closed when the iteration ends. mmap=True, copy=False returns sequences (and
+FASTQ qualities) as zero-copy memoryview slices of the mapping instead; a
+multi-line FASTA sequence has to be joined and is still bytes. The slices are
+only valid until the iteration ends or the reader is closed, so copy
+(bytes(seq)) anything kept longer. Slices still held at that point keep the
+mapping open until they are released.
+
+    for record_id, seq in read_fasta('S1.fasta'):
+        print(record_id.decode(), len(seq))
+"""
+import contextlib
+import gzip
+import mmap as _mmap
+import os
+import sys
+
+CHUNK = 1 << 22
+GZIP_MAGIC = b'\x1f\x8b'
+WHITESPACE = b' \t\r\n'
+
+
+@contextlib.contextmanager
+def open_binary(path):
+    """Binary input for a path or '-' (stdin), decompressed when gzip."""
+    raw = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    try:
+        yield gzip.GzipFile(fileobj=raw) if raw.peek(2)[:2] == GZIP_MAGIC else raw
+    finally:
+        if raw is not sys.stdin.buffer:
+            raw.close()
+
+
+def _header_id(header):
+    fields = header.split(None, 1)
+    return fields[0] if fields else b''
+
+
+def _map_file(path):
+    """Read-only mmap of a plain, non-empty file; None otherwise."""
+    if path == '-' or not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as fh:
+        if fh.read(2) == GZIP_MAGIC or os.fstat(fh.fileno()).st_size == 0:
+            return None
+        return _mmap.mmap(fh.fileno(), 0, access=_mmap.ACCESS_READ)
+
+
+def _blocks(fh, boundary):
+    """
+    Blocks of whole records: everything up to the last occurrence of boundary
+    (b'\\n>' for FASTA) in the data read so far, then the remainder.
+    """
+    buf = bytearray()
+    while True:
+        chunk = fh.read(CHUNK)
+        if not chunk:
+            break
+        search_from = max(len(buf) - len(boundary), 0)
+        buf += chunk
+        last = buf.rfind(boundary, search_from)
+        if last >= 0:
+            yield bytes(buf[:last + 1])
+            del buf[:last + 1]
+    if buf:
+        yield bytes(buf)
+
+
+# -----------------------------------------
+# FASTA
+# -----------------------------------------
+def _fasta_records(block):
+    """Records of a bytes block holding whole FASTA records."""
+    if not block.startswith(b'>'):
+        first = block.find(b'\n>')
+        if first < 0:
+            return
+        block = block[first + 1:]
+    for part in block[1:].split(b'\n>'):
+        header, _, seq = part.partition(b'\n')
+        if b'\n' in seq or b'\r' in seq or b' ' in seq or b'\t' in seq:
+            seq = seq.translate(None, WHITESPACE)
+        yield _header_id(header), seq
+
+
+def _close_mapping(mapped, view):
+    """Close a mapping unless the caller still holds memoryview slices of it."""
+    if view is not None:
+        view.release()
+    try:
+        mapped.close()
+    except BufferError:
+        pass    # exported slices are alive; the mapping goes with the last of them
+
+
+def _fasta_mapped(data, view=None):
+    """Records of a memory-mapped FASTA file; single-line sequences are sliced from view when given."""
+    source = data if view is None else view
+    size = len(data)
+    if data[:1] == b'>':
+        pos = 0
+    else:
+        first = data.find(b'\n>')
+        pos = first + 1 if first >= 0 else -1
+    while 0 <= pos < size:
+        line_end = data.find(b'\n', pos)
+        if line_end < 0:
+            line_end = size
+        header = data[pos + 1:line_end]
+        next_record = data.find(b'\n>', line_end)
+        end = size if next_record < 0 else next_record
+
+        start = line_end + 1
+        while end > start and data[end - 1] in WHITESPACE:
+            end -= 1
+        if all(data.find(c, start, end) < 0 for c in (b'\n', b'\r', b' ', b'\t')):
+            seq = source[start:end]
+        else:
+            seq = data[start:end].translate(None, WHITESPACE)
+        yield _header_id(header), seq
+        pos = -1 if next_record < 0 else next_record + 1
+
+
+def read_fasta(path, mmap=False, copy=True):
+    """Iterate (id, sequence) over a FASTA file."""
+    mapped = _map_file(path) if mmap else None
+    if mapped is not None:
+        view = None if copy else memoryview(mapped)
+        try:
+            yield from _fasta_mapped(mapped, view)
+        finally:
+            _close_mapping(mapped, view)
+        return
+    with open_binary(path) as fh:
+        for block in _blocks(fh, b'\n>'):
+            yield from _fasta_records(block)
+
+
+# -----------------------------------------
+# FASTQ
+# -----------------------------------------
+def _fastq_record(header, seq, plus, qual):
+    if not header.startswith(b'@') or not plus.startswith(b'+'):
+        raise ValueError(f"Malformed FASTQ record: {header[:50]!r}")
+    if len(seq) != len(qual):
+        raise ValueError(f"Sequence and quality lengths differ in FASTQ record {header[:50]!r}")
+    return _header_id(header[1:]), seq, qual
+
+
+def _strip_cr(line):
+    return line[:-1] if line[-1:] == b'\r' else line
+
+
+def _fastq_mapped(data, view=None):
+    source = data if view is None else view
+    size, pos = len(data), 0
+    while pos < size:
+        spans = []
+        for _ in range(4):
+            if pos >= size:
+                raise ValueError("Truncated FASTQ record at end of file")
+            end = data.find(b'\n', pos)
+            if end < 0:
+                end = size
+            spans.append((pos, end - 1 if data[end - 1:end] == b'\r' else end))
+            pos = end + 1
+            if len(spans) == 1 and spans[0][0] == spans[0][1] and not data[pos:].strip():
+                return
+        (h0, h1), (s0, s1), (p0, p1), (q0, q1) = spans
+        yield _fastq_record(data[h0:h1], source[s0:s1], data[p0:p1], source[q0:q1])
+
+
+def read_fastq(path, mmap=False, copy=True):
+    """Iterate (id, sequence, quality) over a four-line FASTQ file."""
+    mapped = _map_file(path) if mmap else None
+    if mapped is not None:
+        view = None if copy else memoryview(mapped)
+        try:
+            yield from _fastq_mapped(mapped, view)
+        finally:
+            _close_mapping(mapped, view)
+        return
+    with open_binary(path) as fh:
+        rest = b''
+        while True:
+            chunk = fh.read(CHUNK)
+            lines = (rest + chunk).split(b'\n')
+            rest = lines.pop() if chunk else b''
+            if not chunk:
+                while lines and not lines[-1].strip():
+                    lines.pop()
+            whole = len(lines) - len(lines) % 4
+            for i in range(0, whole, 4):
+                yield _fastq_record(*(_strip_cr(line) for line in lines[i:i + 4]))
+            if not chunk:
+                if whole != len(lines):
+                    raise ValueError("Truncated FASTQ record at end of file")
+                break
+            rest = b'\n'.join(lines[whole:] + [rest])
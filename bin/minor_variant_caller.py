@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Call minor variants (mixed sites) from the per-position base counts written
+by depth_analysis.py.
+
+A minor variant is any non-consensus base whose frequency among A/C/G/T reads
+is at least --min-freq at a position with at least --min-depth A/C/G/T reads.
+Each call carries its reference-frame codon and amino-acid consequence
+(codon numbering as in the depth table).
+
+Inputs can be long or compact depth CSVs or *_depth.parquet datasets; all are
+evaluated together as whole-array operations. With --filtered-counts the
+quality-filtered counts (depth_analysis.py --min-base-quality /
+--min-mapping-quality) are used instead of the raw counts.
+
+Outputs:
+  <prefix>.csv          – one row per (sample, position, alternative base)
+  <prefix>_summary.csv  – one row per sample with "Minor Variant Sites <SEG>"
+                          columns; report_QC_calculation.py can use these for
+                          the MS flag instead of the Nextclade mixed-site count
+"""
+import argparse
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from codon_engine import substitute_bases, translate_codons
+from segments import segments_of
+
+BASES = ['A', 'T', 'C', 'G']
+COUNT_COLS = [f"{b}_Count" for b in BASES]
+FILTERED_COUNT_COLS = [f"{b}_Count_Filtered" for b in BASES]
+ID_COLS = ['MetaID', 'Reference', 'Position', 'CodonIndex', 'Frame', 'Codon', 'AA']
+
+SEGMENT_ORDER = ['HA', 'NA', 'MP', 'NP', 'NS', 'PA', 'PB1', 'PB2']
+SUMMARY_PREFIX = 'Minor Variant Sites'
+
+
+def read_depth(paths, count_cols=COUNT_COLS):
+    """Load the columns needed from depth tables, one row per position."""
+    use_cols = ID_COLS + count_cols
+    frames = []
+    for path in paths:
+        if os.path.isdir(path):
+            df = pd.read_parquet(path, columns=use_cols + ['Base'] if _is_long_parquet(path) else use_cols)
+            # dictionary-encoded columns arrive as categoricals
+            df = df.astype({c: object for c in df.select_dtypes('category').columns})
+        else:
+            header = pd.read_csv(path, nrows=0).columns
+            cols = use_cols + (['Base'] if 'Base' in header else [])
+            df = pd.read_csv(path, usecols=cols, dtype={'MetaID': str, 'Reference': str, 'Codon': str, 'AA': str})
+        if 'Base' in df.columns:
+            # long layout repeats every position four times
+            df = df[df['Base'] == BASES[0]].drop(columns='Base')
+        frames.append(df.rename(columns=dict(zip(count_cols, COUNT_COLS))))
+    if not frames:
+        return pd.DataFrame(columns=ID_COLS + COUNT_COLS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _is_long_parquet(path):
+    import pyarrow.dataset as ds
+
+    return 'Base' in ds.dataset(path, format='parquet', partitioning='hive').schema.names
+
+
+def call_minor_variants(df, min_freq=0.1, min_depth=20):
+    """Return one row per minor variant passing the frequency and depth thresholds."""
+    counts = df[COUNT_COLS].to_numpy(dtype=np.int64)
+    depth = counts.sum(axis=1)
+    consensus = counts.argmax(axis=1)
+    freq = counts / np.maximum(depth, 1)[:, None]
+
+    mask = (freq >= min_freq) & (depth >= min_depth)[:, None]
+    mask[np.arange(len(counts)), consensus] = False
+    rows, alt = np.nonzero(mask)
+
+    base_arr = np.array(BASES)
+    sub = df.iloc[rows]
+    ref_codon = sub['Codon'].fillna('NNN').to_numpy(dtype='<U3')
+    alt_codon = substitute_bases(ref_codon, sub['Frame'].to_numpy(dtype=np.int64), base_arr[alt])
+    ref_aa = sub['AA'].fillna('X').to_numpy(dtype='<U1')
+    alt_aa = translate_codons(alt_codon)
+
+    consequence = np.select(
+        [(ref_aa == 'X') | (alt_aa == 'X'), ref_aa == alt_aa, alt_aa == '*'],
+        ['unknown', 'synonymous', 'nonsense'],
+        default='missense',
+    )
+    codon_index = sub['CodonIndex'].to_numpy(dtype=np.int64)
+
+    return pd.DataFrame({
+        'Sample': sub['MetaID'].to_numpy(),
+        'Segment': segments_of(sub['Reference']).to_numpy(),
+        'Reference': sub['Reference'].to_numpy(),
+        'Position': sub['Position'].to_numpy(),
+        'Depth': depth[rows],
+        'Consensus': base_arr[consensus[rows]],
+        'Alt': base_arr[alt],
+        'Alt_Count': counts[rows, alt],
+        'Frequency': freq[rows, alt].round(4),
+        'CodonIndex': codon_index,
+        'Frame': sub['Frame'].to_numpy(),
+        'Ref_Codon': ref_codon,
+        'Alt_Codon': alt_codon,
+        'Ref_AA': ref_aa,
+        'Alt_AA': alt_aa,
+        'AA_Change': np.char.add(np.char.add(ref_aa, codon_index.astype(str)), alt_aa),
+        'Consequence': consequence,
+    })
+
+
+def summarise(depth_df, variants):
+    """One row per sample with the number of minor-variant positions per segment."""
+    present = pd.DataFrame({
+        'Sample': depth_df['MetaID'].to_numpy(),
+        'Segment': segments_of(depth_df['Reference']).to_numpy(),
+    }).drop_duplicates()
+    present['Sites'] = 0
+
+    sites = (
+        variants.drop_duplicates(['Sample', 'Segment', 'Reference', 'Position'])
+        .groupby(['Sample', 'Segment']).size()
+    )
+    present = present.set_index(['Sample', 'Segment'])
+    present.loc[sites.index, 'Sites'] = sites.to_numpy()
+
+    summary = present['Sites'].unstack('Segment')
+    summary = summary.reindex(columns=SEGMENT_ORDER)
+    summary.columns = [f"{SUMMARY_PREFIX} {seg}" for seg in summary.columns]
+    summary[SUMMARY_PREFIX] = summary.sum(axis=1, min_count=1)
+    return summary.astype('Int64').reset_index()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Call minor variants from depth_analysis.py base counts")
+    parser.add_argument(
+        "inputs",
+        nargs='*',
+        help="Depth CSVs or Parquet datasets (default: *_long.csv, *_compact.csv, *_depth.parquet)",
+    )
+    parser.add_argument("--min-freq", type=float, default=0.1, help="Minimum minor-base frequency (default: 0.1)")
+    parser.add_argument("--min-depth", type=int, default=20, help="Minimum A/C/G/T depth (default: 20)")
+    parser.add_argument("--prefix", default='minor_variants', help="Output prefix (default: minor_variants)")
+    parser.add_argument(
+        "--filtered-counts",
+        action="store_true",
+        help="Use the quality-filtered counts (A/T/C/G_Count_Filtered) instead of the raw counts",
+    )
+    args = parser.parse_args()
+
+    inputs = args.inputs or sorted(
+        glob.glob('*_long.csv') + glob.glob('*_compact.csv') + glob.glob('*_depth.parquet')
+    )
+    depth_df = read_depth(inputs, FILTERED_COUNT_COLS if args.filtered_counts else COUNT_COLS)
+    variants = call_minor_variants(depth_df, args.min_freq, args.min_depth)
+    summary = summarise(depth_df, variants)
+
+    variants.to_csv(f"{args.prefix}.csv", index=False)
+    summary.to_csv(f"{args.prefix}_summary.csv", index=False, na_rep='NA')
+    print(f"{len(variants)} minor variants in {len(summary)} samples written to {args.prefix}.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,299 @@
-import pandas as pd
-import sys
-import re
-import os.path
-from Bio import SeqIO
-from Bio.Seq import Seq
-from Bio.Align import PairwiseAligner
+#!/usr/bin/env python3
+"""
+Amino-acid differences between sample segments and the mutation-of-interest
+reference for a comparison type (mamailian, inhibition, human_vaccine, ...).
+
+Single segment (one call per segment and comparison type):
 
+    mutation_finder.py <sequence.fasta> <reference_dir> <segment> <subtype> <output.csv> <type>
 
-sequence_file = sys.argv[1]
-reference_file = sys.argv[2]
-segment = sys.argv[3]
-subtype = sys.argv[4]
-output_file = sys.argv[5]
-type = sys.argv[6]
+Batch mode, one process for all segment FASTAs of a sample:
 
+    mutation_finder.py --batch --sample S1 --subtype H5N1 --references <reference_dir> \\
+        --types mamailian,inhibition,human_vaccine --threads 4 *translation*fasta
 
-reference_file = os.path.join(reference_file, type + '/' + subtype + '/' + segment + '.fasta')
-print("python reference: {}".format(reference_file))
+The segment is taken from each file name as in the MUTATION modules
+(S1_nextclade.cds_translation.HA.fasta -> HA) and a comparison type is only run
+for the segments it applies to (see COMPARISONS). Each reference FASTA is read
+once and the alignments run in parallel; the outputs are the same files the
+single-segment calls write:
 
-print("python segment: {}".format(segment))
+    <sample>_<segment>_<tag>_mutation.csv (+ _report, _full_mutation_list, _full_mutation_list_report)
 
+References are looked up as <reference_dir>/<type>/<subtype>/<segment>.fasta.
+When that file holds several records, each sample record is only aligned to
+the one sharing the most k-mers with it (--all-references restores the
+all-pairs comparison); the chosen record ID is written in a Reference column.
+
+--cache-dir keeps the difference arrays in an on-disk cache keyed by the
+reference, query and aligner settings (see alignment_cache.py), so repeated
+sequences (reanalysis, positive controls) are not re-aligned. The directory
+must be an absolute path shared between tasks; hits and misses are printed.
+
+--parquet also writes the long-format mutation table (one row per sample,
+protein, comparison and position; see mutation_table.py). The CSVs above are
+rendered from that table.
+
+--aligner banded aligns near-reference sequences through exact k-mer seed
+anchors and only runs the global aligner between them (see banded_align); it
+falls back to the full global alignment whenever the seeds do not fit a band.
+"""
+import argparse
+import bisect
+import os.path
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-# Function to align sequences and find differences
-def find_differences(reference, seq):
+import numpy as np
+import pandas as pd
+from Bio.Seq import Seq
+from Bio.Align import Alignment, PairwiseAligner
+
+import fastx
+import mutation_table
+
+
+# -----------------------------------------
+# Alignment and differences
+# -----------------------------------------
+MATCH, SUB, DEL, INS = 'match', 'sub', 'del', 'ins'
+
+
+def make_aligner():
     aligner = PairwiseAligner()
     aligner.mode = 'global'
     aligner.open_gap_score = -10  # Penalty for opening a gap
     aligner.extend_gap_score = -1  # Penalty for extending a gap
-    alignments = aligner.align(reference, seq)
-    
-    # Take the best alignment
-    best_alignment = alignments[0]
-    differences = []
-    all_positions = []
-    ref_pos = 1  # Biological indexing starts at 1
-
-    for i in range(len(best_alignment[0])):
-        ref_char = best_alignment[0][i]
-        seq_char = best_alignment[1][i]
-
-        if ref_char == "-":
-            if seq_char != "-":
-                if differences and differences[-1].startswith(f"ins{ref_pos}"):
-                    differences[-1] += seq_char
-                else:
-                    differences.append(f"ins{ref_pos}{seq_char}")
+    return aligner
+
+
+def _chars(seq):
+    return np.array(list(str(seq)), dtype='<U1')
+
+
+def alignment_diffs(alignment):
+    """
+    Structured array (ref_pos, ref, alt, kind) for an alignment, built block by
+    block from alignment.coordinates: one row per reference position (kind
+    match/sub/del) plus one row per insertion, in alignment order. A '-' in the
+    query counts as a deletion inside an aligned block and is dropped from
+    insertions; the reference is assumed to be gap free.
+    """
+    ref, qry = str(alignment.target), str(alignment.query)
+    coords = alignment.coordinates
+    pos, refs, alts, kinds = [], [], [], []
+
+    for r0, r1, q0, q1 in zip(coords[0][:-1], coords[0][1:], coords[1][:-1], coords[1][1:]):
+        if r1 > r0 and q1 > q0:
+            r, q = _chars(ref[r0:r1]), _chars(qry[q0:q1])
+            pos.append(np.arange(r0 + 1, r1 + 1))
+            refs.append(r)
+            alts.append(q)
+            kinds.append(np.where(q == '-', DEL, np.where(r == q, MATCH, SUB)))
+        elif r1 > r0:
+            pos.append(np.arange(r0 + 1, r1 + 1))
+            refs.append(_chars(ref[r0:r1]))
+            alts.append(np.full(r1 - r0, '-'))
+            kinds.append(np.full(r1 - r0, DEL))
+        elif q1 > q0 and qry[q0:q1].strip('-'):
+            pos.append([r0 + 1])
+            refs.append(['-'])
+            alts.append([qry[q0:q1].replace('-', '')])
+            kinds.append([INS])
+
+    alt = np.concatenate(alts) if alts else np.empty(0, dtype='<U1')
+    diffs = np.empty(len(alt), dtype=[
+        ('ref_pos', np.int32), ('ref', '<U1'), ('alt', alt.dtype if alt.size else '<U1'), ('kind', '<U5'),
+    ])
+    if alts:
+        diffs['ref_pos'] = np.concatenate(pos)
+        diffs['ref'] = np.concatenate(refs)
+        diffs['alt'] = alt
+        diffs['kind'] = np.concatenate(kinds)
+    return diffs
+
+
+def diff_strings(diffs):
+    """
+    The semicolon-joined differences (K12R, del12K, ins12KR) and the full
+    per-position list (K12R, K12K, K12-) for an alignment_diffs array.
+    """
+    kind = diffs['kind']
+    pos = diffs['ref_pos'].astype(str)
+    token = np.char.add(np.char.add(diffs['ref'], pos), diffs['alt'])
+    differences = np.where(
+        kind == INS,
+        np.char.add(np.char.add('ins', pos), diffs['alt']),
+        np.where(kind == DEL, np.char.add(np.char.add('del', pos), diffs['ref']), token),
+    )
+    return ";".join(differences[kind != MATCH].tolist()), ";".join(token[kind != INS].tolist())
+
+
+def find_differences(reference, seq, structured=False, banded=False):
+    """
+    Globally align seq to reference and return (differences, all_positions),
+    or the alignment_diffs array when structured is set. With banded the
+    seeded alignment is tried first (see banded_align).
+    """
+    aligner = make_aligner()
+    best_alignment = banded_align(aligner, str(reference), str(seq)) if banded else None
+    if best_alignment is None:
+        best_alignment = aligner.align(reference, seq)[0]
+    diffs = alignment_diffs(best_alignment)
+    if structured:
+        return diffs
+    return diff_strings(diffs)
+
+
+
+# -----------------------------------------
+# Seeded (banded) alignment
+# -----------------------------------------
+SEED_K = 5              # k-mer length of the exact-match seeds
+BAND = 32               # maximum diagonal offset of the seed chain and of any gap run
+ANCHOR_MARGIN = 8       # residues trimmed from each anchor end, left to the aligner
+MIN_ANCHOR = 40         # shorter exact runs are left to the aligner (a detour
+                        # through them can cost more in gap penalties than it gains)
+MIN_SEED_COVERAGE = 0.5  # fraction of the reference the seed chain must cover
+MIN_SCORE_FRACTION = 0.8  # banded score below this times the reference length falls back
+
+SELECT_K = 5            # k-mer length of the closest-reference prefilter
+
+
+def _kmer_codes(seq, k):
+    """Integer code of every k-mer of seq (one byte per residue, k <= 8)."""
+    chars = np.frombuffer(seq.encode(), dtype=np.uint8).astype(np.int64)
+    n = len(chars) - k + 1
+    codes = np.zeros(max(n, 0), dtype=np.int64)
+    for j in range(k if n > 0 else 0):
+        codes = (codes << 8) | chars[j:j + n]
+    return codes
+
+
+def _unique_kmers(seq, k):
+    """(k-mer codes, start positions) of the k-mers that occur once in seq."""
+    kmers, starts, counts = np.unique(_kmer_codes(seq, k), return_index=True, return_counts=True)
+    return kmers[counts == 1], starts[counts == 1]
+
+
+def _increasing_chain(ref_starts, seq_starts):
+    """Indices of the longest chain of seeds (sorted by ref) that also increases in seq."""
+    if np.all(np.diff(seq_starts) > 0):
+        return np.arange(len(seq_starts))
+    tails, tail_idx, prev = [], [], [-1] * len(seq_starts)
+    for i, q in enumerate(seq_starts.tolist()):
+        j = bisect.bisect_left(tails, q)
+        if j == len(tails):
+            tails.append(q)
+            tail_idx.append(i)
+        else:
+            tails[j] = q
+            tail_idx[j] = i
+        prev[i] = tail_idx[j - 1] if j else -1
+    chain, i = [], tail_idx[-1]
+    while i >= 0:
+        chain.append(i)
+        i = prev[i]
+    return np.array(chain[::-1])
+
+
+def seed_anchors(reference, seq, k=SEED_K, band=BAND, margin=ANCHOR_MARGIN):
+    """
+    Exact-match anchors (ref_start, ref_end, seq_start) from k-mers that occur
+    once in both sequences, chained along the main diagonal and trimmed by
+    margin residues at both ends. None when the chain leaves the band or
+    covers too little of the reference.
+    """
+    ref_kmers, ref_starts = _unique_kmers(reference, k)
+    seq_kmers, seq_starts = _unique_kmers(seq, k)
+    _, ref_idx, seq_idx = np.intersect1d(ref_kmers, seq_kmers, assume_unique=True, return_indices=True)
+    if len(ref_idx) == 0:
+        return None
+    order = np.argsort(ref_starts[ref_idx])
+    r, q = ref_starts[ref_idx][order], seq_starts[seq_idx][order]
+    near = np.abs(q - r - np.median(q - r)) <= band
+    r, q = r[near], q[near]
+    if len(r) == 0:
+        return None
+    chain = _increasing_chain(r, q)
+    r, q = r[chain], q[chain]
+
+    # overlapping or adjacent seeds on one diagonal form one exact run
+    diagonal = q - r
+    breaks = np.flatnonzero((np.diff(diagonal) != 0) | (np.diff(r) > k)) + 1
+    first = np.concatenate([[0], breaks])
+    last = np.concatenate([breaks, [len(r)]]) - 1
+    run_start, run_end, run_diagonal = r[first], r[last] + k, diagonal[first]
+    if run_diagonal.max() - run_diagonal.min() > band:
+        return None
+    if (run_end - run_start).sum() < MIN_SEED_COVERAGE * len(reference):
+        return None
+
+    anchors, ref_end, seq_end = [], 0, 0
+    for start, end, d in zip(run_start.tolist(), run_end.tolist(), run_diagonal.tolist()):
+        if end - start < MIN_ANCHOR:
             continue
-
-        if seq_char == "-":  # Deletion
-            differences.append(f"del{ref_pos}{ref_char}")
-            all_positions.append(f"{ref_char}{ref_pos}-")
+        start, end = start + margin, end - margin
+        if start < ref_end or start + d < seq_end:
+            continue
+        anchors.append((start, end, start + d))
+        ref_end, seq_end = end, end + d
+    return anchors
+
+
+def _align_piece(aligner, reference, seq, band=BAND):
+    """(score, coordinates) of a global alignment of the stretch between two anchors."""
+    if not reference and not seq:
+        return 0.0, []
+    if abs(len(reference) - len(seq)) > band:
+        return None
+    if not reference or not seq:
+        gap = len(reference) or len(seq)
+        return aligner.open_gap_score + (gap - 1) * aligner.extend_gap_score, [(len(reference), len(seq))]
+    piece = aligner.align(reference, seq)[0]
+    return piece.score, [tuple(point) for point in piece.coordinates.T[1:]]
+
+
+def _step(a, b):
+    return b[0] > a[0], b[1] > a[1]
+
+
+def banded_align(aligner, reference, seq):
+    """
+    Align seq to reference through the exact seed anchors, running the global
+    aligner only on the stretches between them. Returns None (use the full
+    global alignment) when the seeds do not give a usable diagonal, a gap
+    would leave the band, or the score is below MIN_SCORE_FRACTION.
+    """
+    anchors = seed_anchors(reference, seq)
+    if anchors is None:
+        return None
+
+    points, score, ref_pos, seq_pos = [(0, 0)], 0.0, 0, 0
+    for start, end, q in anchors + [(len(reference), len(reference), len(seq))]:
+        piece = _align_piece(aligner, reference[ref_pos:start], seq[seq_pos:q])
+        if piece is None:
+            return None
+        piece_score, piece_points = piece
+        score += piece_score + (end - start) * aligner.match_score
+        points.extend((ref_pos + r, seq_pos + s) for r, s in piece_points)
+        ref_pos, seq_pos = end, q + end - start
+        points.append((ref_pos, seq_pos))
+    if score < MIN_SCORE_FRACTION * len(reference):
+        return None
+
+    # drop empty steps and merge collinear ones, as in PairwiseAligner coordinates
+    coords = [points[0]]
+    for point in points[1:]:
+        if point == coords[-1]:
+            continue
+        if len(coords) > 1 and _step(coords[-2], coords[-1]) == _step(coords[-1], point):
+            coords[-1] = point
         else:
-            token = f"{ref_char}{ref_pos}{seq_char}"
-            all_positions.append(token)
-            if ref_char != seq_char:
-                differences.append(token)
-
-        if ref_char != "-":
-            ref_pos += 1
-
-    return ";".join(differences), ";".join(all_positions)
-
+            coords.append(point)
+    alignment = Alignment([reference, seq], np.array(coords).T)
+    alignment.score = score
+    return alignment
 
 
 def check_frameshift(seq):
@@ -69,84 +302,319 @@ def check_frameshift(seq):
     else:
         return 'N.A.'
 
-def process_differences(row):
-        return row['Differences']
-    
-
-sequences = []
-
-print(sequence_file)
-for ref in SeqIO.parse(reference_file, 'fasta'):
-    reference = Seq(str(ref.seq))
-    for record in SeqIO.parse(sequence_file, 'fasta'):
-        sequence = Seq(str(record.seq))
-        differences, all_positions = find_differences(reference, sequence)
-        frameshift = check_frameshift(str(sequence))
-        sequences.append({'ID': record.id, 'Differences': differences, 'All_Positions': all_positions})
-
-# Create a DataFrame from the sequences
-df = pd.DataFrame(sequences)
-
-# Create a DataFrame from the sequences
-df = pd.DataFrame(sequences)
-
-if df.empty:
-    print("Warning: No sequences were processed; DataFrame is empty.")
-    # Create an empty DataFrame with the expected columns
-    empty_df = pd.DataFrame(columns=["Sample", "Differences"])
-    # Save the empty CSVs so downstream steps have output files
-    empty_df.to_csv(output_file, index=False)
-    output_file_report = output_file.replace('.csv', '_report.csv')
-    empty_df.to_csv(output_file_report, index=False)
-    full_output = output_file.replace('.csv', '_full_mutation_list.csv')
-    full_output_report = full_output.replace('.csv', '_report.csv')
-    empty_full_df = pd.DataFrame(columns=["Sample", "All_Positions"])
-    empty_full_df.to_csv(full_output, index=False)
-    empty_full_df.to_csv(full_output_report, index=False)
-    sys.exit(0)
+# -----------------------------------------
+# Comparison types
+# -----------------------------------------
+def _inhibition_segment(segment):
+    return ('NA' in segment or ('PA' in segment and 'PA-X' not in segment) or 'M2' in segment) \
+        and 'BM2' not in segment
+
 
-df['Differences'] = df.apply(process_differences, axis=1)
+def _vaccine_segment(segment):
+    return 'HA' in segment or 'NA' in segment
 
 
- 
-#df['Differences'] = df.apply(process_differences, axis=1)
+def _human_segment(segment):
+    return not any(s in segment for s in ('NEP', 'PA-X', 'PB1-F2', 'BM2'))
 
-# Split "ID" column into "sample" and "Ref_Name" columns
-df[['Sample', 'Ref_Name']] = df['ID'].str.split('|', n=1, expand=True)
 
-# Drop the original "ID" column
-df.drop(columns=['Ref_Name'], inplace=True)
-df.drop(columns=['ID'], inplace=True)
+# type -> (output file tag, segments it applies to)
+COMPARISONS = {
+    'mamailian': ('mamailian', lambda segment: True),
+    'inhibition': ('inhibtion', _inhibition_segment),
+    'human_vaccine': ('vaccine', _vaccine_segment),
+    'human': ('human', _human_segment),
+    'inhibition_human': ('inhibtion', _inhibition_segment),
+}
 
 
-df = df[['Sample', 'Differences', 'All_Positions']]
+def reference_path(reference_dir, comparison, subtype, segment):
+    return os.path.join(reference_dir, comparison + '/' + subtype + '/' + segment + '.fasta')
 
 
-# Remove any instance of 'ins...' or 'del...' in the 'Differences' column
-df['Differences'] = df['Differences'].str.replace(r'\bins[^\s;]*;?|\bdel[^\s;]*;?', '', regex=True)
+def segment_from_filename(path):
+    """Segment name as the MUTATION modules derive it, e.g. S1_nextclade.cds_translation.HA.fasta -> HA."""
+    name = os.path.basename(path)
+    if '.' in name:
+        name = name.rsplit('.', 1)[0]
+    return name.split('.')[-1].split('_')[-1]
 
-# Remove any trailing or leading semicolons that may remain
-df['Differences'] = df['Differences'].str.strip(';')
 
-# Replace empty strings with 'No mutations found'
-df['Differences'] = df['Differences'].replace('', 'No mutations found')
+def read_fasta(path):
+    return [(record_id.decode(), seq.decode()) for record_id, seq in fastx.read_fasta(path)]
 
-# Save the final dataframe to a CSV file
-df_main = df[['Sample', 'Differences']].copy()
-df_main.to_csv(output_file, index=False)
 
-output_file_report = output_file.replace('.csv', '_report.csv')
-full_output = output_file.replace('.csv', '_full_mutation_list.csv')
-full_output_report = full_output.replace('.csv', '_report.csv')
+# -----------------------------------------
+# Comparison and output tables
+# -----------------------------------------
+def kmer_set(seq, k=SELECT_K):
+    return np.unique(_kmer_codes(seq, k))
 
-new_name = segment + ' ' + 'Differences' + ' ' + type
-df_report = df_main.rename(columns={'Differences': new_name})
 
-# Save the final dataframe to a CSV file
-df_report.to_csv(output_file_report, index=False)
+def closest_reference(reference_kmers, seq, k=SELECT_K):
+    """Index of the reference sharing the most distinct k-mers with seq (the first one on ties)."""
+    if len(reference_kmers) == 1:
+        return 0
+    query = kmer_set(seq, k)
+    shared = [np.intersect1d(kmers, query, assume_unique=True).size for kmers in reference_kmers]
+    return int(np.argmax(shared))
 
-full_column_name = f"{segment} {type} full amino acid list"
-df_full = df[['Sample', 'All_Positions']].copy()
-df_full.rename(columns={'All_Positions': full_column_name}, inplace=True)
-df_full.to_csv(full_output, index=False)
-df_full.to_csv(full_output_report, index=False)
+
+def compare(references, records, banded=False, all_references=False, cache=None):
+    """
+    (record ID, reference ID, alignment_diffs array) for every sample record
+    against its closest (id, sequence) reference, or for every (reference,
+    record) pair with all_references. Pairs found in the AlignmentCache are
+    not re-aligned.
+    """
+    if all_references:
+        pairs = [(ref, record) for ref in references for record in records]
+    else:
+        reference_kmers = [kmer_set(ref_seq) for _, ref_seq in references]
+        pairs = [(references[closest_reference(reference_kmers, record[1])], record) for record in records]
+
+    results = []
+    for (ref_id, ref_seq), (record_id, seq) in pairs:
+        diffs = cache.get(ref_seq, seq) if cache else None
+        if diffs is None:
+            diffs = find_differences(Seq(ref_seq), Seq(seq), structured=True, banded=banded)
+            if cache:
+                cache.put(ref_seq, seq, diffs)
+        results.append((record_id, ref_id, diffs))
+    return results
+
+
+def _compare_unit(task):
+    """compare() for one batch unit, with the cache hits and misses it added."""
+    cache = task[-1]
+    before = (cache.hits, cache.misses) if cache else (0, 0)
+    sequences = compare(*task)
+    after = (cache.hits, cache.misses) if cache else (0, 0)
+    return sequences, after[0] - before[0], after[1] - before[1]
+
+
+def open_cache(cache_dir, max_mb, banded):
+    """AlignmentCache keyed on the aligner settings, or None without a cache directory."""
+    if not cache_dir:
+        return None
+    from alignment_cache import AlignmentCache
+
+    aligner = make_aligner()
+    params = (
+        f"diffs-v1|{aligner.mode}|{aligner.match_score}|{aligner.mismatch_score}|"
+        f"{aligner.open_gap_score}|{aligner.extend_gap_score}|banded={banded}"
+    )
+    return AlignmentCache(cache_dir, int(max_mb * 1024 * 1024), params)
+
+
+def write_outputs(table, output_file, segment, comparison):
+    """
+    Write <output_file> and its _report, _full_mutation_list and
+    _full_mutation_list_report companions as views of the long mutation table.
+    """
+    if table.empty:
+        print("Warning: No sequences were processed; DataFrame is empty.")
+        # Create an empty DataFrame with the expected columns
+        empty_df = pd.DataFrame(columns=["Sample", "Differences", "Reference"])
+        # Save the empty CSVs so downstream steps have output files
+        empty_df.to_csv(output_file, index=False)
+        output_file_report = output_file.replace('.csv', '_report.csv')
+        empty_df.to_csv(output_file_report, index=False)
+        full_output = output_file.replace('.csv', '_full_mutation_list.csv')
+        full_output_report = full_output.replace('.csv', '_report.csv')
+        empty_full_df = pd.DataFrame(columns=["Sample", "All_Positions", "Reference"])
+        empty_full_df.to_csv(full_output, index=False)
+        empty_full_df.to_csv(full_output_report, index=False)
+        return
+
+    df = mutation_table.views(table)
+
+    # Save the final dataframe to a CSV file
+    df_main = df[['Sample', 'Differences', 'Reference']].copy()
+    df_main.to_csv(output_file, index=False)
+
+    output_file_report = output_file.replace('.csv', '_report.csv')
+    full_output = output_file.replace('.csv', '_full_mutation_list.csv')
+    full_output_report = full_output.replace('.csv', '_report.csv')
+
+    new_name = segment + ' ' + 'Differences' + ' ' + comparison
+    reference_name = segment + ' ' + 'Reference' + ' ' + comparison
+    df_report = df_main.rename(columns={'Differences': new_name, 'Reference': reference_name})
+
+    # Save the final dataframe to a CSV file
+    df_report.to_csv(output_file_report, index=False)
+
+    full_column_name = f"{segment} {comparison} full amino acid list"
+    df_full = df[['Sample', 'All_Positions', 'Reference']].copy()
+    df_full.rename(columns={'All_Positions': full_column_name, 'Reference': reference_name}, inplace=True)
+    df_full.to_csv(full_output, index=False)
+    df_full.to_csv(full_output_report, index=False)
+
+
+# -----------------------------------------
+# Single segment and batch runs
+# -----------------------------------------
+def run_single(sequence_file, reference_dir, segment, subtype, output_file, comparison, banded=False,
+               all_references=False, cache=None, parquet=False):
+    reference_file = reference_path(reference_dir, comparison, subtype, segment)
+    print("python reference: {}".format(reference_file))
+    print("python segment: {}".format(segment))
+    print(sequence_file)
+
+    references = read_fasta(reference_file)
+    pairs = compare(references, read_fasta(sequence_file), banded, all_references, cache)
+    table = mutation_table.from_diffs(pairs, segment, comparison)
+    write_outputs(table, output_file, segment, comparison)
+    if parquet:
+        mutation_table.write_parquet(table, os.path.splitext(output_file)[0] + '.parquet')
+    if cache:
+        print(cache.stats())
+
+
+def batch_units(fasta_files, sample, subtype, reference_dir, comparisons):
+    """(fasta, segment, comparison, reference file, output file) for every applicable pair."""
+    units = []
+    for fasta in fasta_files:
+        segment = segment_from_filename(fasta)
+        for comparison in comparisons:
+            tag, applies = COMPARISONS[comparison]
+            if not applies(segment):
+                print(f"Skipping {comparison} for segment {segment}")
+                continue
+            units.append((
+                fasta, segment, comparison,
+                reference_path(reference_dir, comparison, subtype, segment),
+                f"{sample}_{segment}_{tag}_mutation.csv",
+            ))
+    return units
+
+
+def run_batch(fasta_files, sample, subtype, reference_dir, comparisons, threads=1, banded=False,
+              all_references=False, cache=None, parquet=False):
+    """
+    Compare every segment FASTA against every applicable comparison type; with
+    parquet all results also go to one <sample>_mutations.parquet table.
+    Returns the number of units that failed (e.g. missing reference).
+    """
+    units = batch_units(fasta_files, sample, subtype, reference_dir, comparisons)
+
+    # Every reference and sample FASTA is parsed once
+    references, records, failed = {}, {}, 0
+    for fasta, _, _, ref_file, _ in units:
+        if fasta not in records:
+            records[fasta] = read_fasta(fasta)
+        if ref_file not in references:
+            try:
+                references[ref_file] = read_fasta(ref_file)
+            except OSError as e:
+                print(f"Error reading reference {ref_file}: {e}", file=sys.stderr)
+                references[ref_file] = None
+
+    todo = []
+    for unit in units:
+        if references[unit[3]] is None:
+            failed += 1
+        else:
+            todo.append(unit)
+    tasks = [
+        (references[ref_file], records[fasta], banded, all_references, cache)
+        for fasta, _, _, ref_file, _ in todo
+    ]
+
+    if threads > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(_compare_unit, tasks))
+    else:
+        results = [_compare_unit(task) for task in tasks]
+    if cache:
+        cache.hits = sum(hits for _, hits, _ in results)
+        cache.misses = sum(misses for _, _, misses in results)
+        print(cache.stats())
+
+    tables = []
+    for (fasta, segment, comparison, ref_file, output_file), (pairs, _, _) in zip(todo, results):
+        print(f"{fasta}: {segment} vs {ref_file} -> {output_file}")
+        tables.append(mutation_table.from_diffs(pairs, segment, comparison))
+        try:
+            write_outputs(tables[-1], output_file, segment, comparison)
+        except Exception as e:
+            print(f"Error writing {output_file}: {e}", file=sys.stderr)
+            failed += 1
+
+    if parquet:
+        table_file = f"{sample}_mutations.parquet"
+        mutation_table.write_parquet(pd.concat(tables or [mutation_table.empty()], ignore_index=True), table_file)
+        print(f"Mutation table written to {table_file}")
+    return failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Find amino-acid differences against mutation-of-interest references",
+        usage="%(prog)s sequence_file reference_dir segment subtype output_file type\n"
+              "       %(prog)s --batch --sample ID --subtype SUBTYPE --references DIR --types T1,T2 FASTA [FASTA ...]",
+    )
+    parser.add_argument("inputs", nargs='*', help="Single-segment arguments, or segment FASTAs with --batch")
+    parser.add_argument("--batch", action="store_true", help="Process all segment FASTAs of one sample")
+    parser.add_argument("--sample", help="Sample ID used in the output file names (--batch)")
+    parser.add_argument("--subtype", help="Subtype, selects the reference directory (--batch)")
+    parser.add_argument("--references", help="Reference directory (--batch)")
+    parser.add_argument(
+        "--types",
+        default='mamailian',
+        help=f"Comma-separated comparison types for --batch; one of {', '.join(COMPARISONS)} (default: mamailian)",
+    )
+    parser.add_argument("--threads", type=int, default=1, help="Parallel alignments in --batch mode (default: 1)")
+    parser.add_argument(
+        "--aligner",
+        choices=['global', 'banded'],
+        default='global',
+        help="global: full PairwiseAligner alignment; banded: seeded alignment around the main diagonal, "
+             "falling back to global when it does not apply (default: global)",
+    )
+    parser.add_argument(
+        "--all-references",
+        action="store_true",
+        help="Align every sample record against every reference record instead of only the closest one",
+    )
+    parser.add_argument(
+        "--parquet",
+        action="store_true",
+        help="Also write the long-format mutation table (<sample>_mutations.parquet, or <output>.parquet)",
+    )
+    parser.add_argument("--cache-dir", help="Directory of the on-disk alignment cache (default: no cache)")
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=1024,
+        help="Cache size limit in MB; least recently used entries are evicted (default: 1024)",
+    )
+    args = parser.parse_args()
+    banded = args.aligner == 'banded'
+    cache = open_cache(args.cache_dir, args.cache_size, banded)
+
+    if not args.batch:
+        if len(args.inputs) != 6:
+            parser.error("expected: sequence_file reference_dir segment subtype output_file type")
+        run_single(
+            *args.inputs, banded=banded, all_references=args.all_references, cache=cache, parquet=args.parquet,
+        )
+        return
+
+    if not (args.sample and args.subtype and args.references):
+        parser.error("--batch needs --sample, --subtype and --references")
+    comparisons = [t for t in args.types.split(',') if t]
+    unknown = [t for t in comparisons if t not in COMPARISONS]
+    if unknown:
+        parser.error(f"unknown comparison type(s): {', '.join(unknown)}")
+
+    failed = run_batch(
+        args.inputs, args.sample, args.subtype, args.references, comparisons,
+        args.threads, banded, args.all_references, cache, args.parquet,
+    )
+    if failed:
+        sys.exit(f"{failed} comparison(s) failed")
+
+
+if __name__ == "__main__":
+    main()
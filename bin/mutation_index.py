@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Compiled index of mutation-of-interest workbooks
+(Inhibtion_Mutations_of_Intrest_2324.xlsx, Mammalian_Mutations_of_Intrest_2324.xlsx).
+
+Reading the XLSX with openpyxl is slow, so a workbook is compiled once into a
+JSON index mapping (segment, subtype) -> position+alt suffix -> rule rows,
+e.g. ('NA1', 'H1N1') -> '275Y' -> [rows mentioning H275Y]. The index is
+cached next to the workbook as .<workbook>.index.json (or in the working
+directory when that is not writable) and rebuilt whenever the SHA-256 of the
+workbook changes.
+
+A rule's mutation cell is split on ';' into components that must all be
+present in the sample ('H275Y;I436N' needs both). Matching compares
+mutation_suffix() of both sides, as table_lookup.py did, so it ignores the
+left-hand amino acid and a component is otherwise taken literally
+('D222G/N' only matches a sample mutation written 222G/N). RuleEngine combines several workbooks into one suffix
+map per (segment, subtype), so a sample's mutations are checked against every
+rule table in one pass:
+
+    engine = RuleEngine({
+        'inhibtion': (load_index('Inhibtion_Mutations_of_Intrest_2324.xlsx'), False),
+        'mammalian': (load_index('Mammalian_Mutations_of_Intrest_2324.xlsx'), True),   # any subtype
+    })
+    results = engine.evaluate(['H275Y', 'K130N'], 'NA1', 'H1N1')
+    matched, unmatched_rules = results['inhibtion']
+
+Usage: mutation_index.py <workbook.xlsx> [...]   (compile ahead of time)
+"""
+import json
+import os
+import sys
+
+from cache_io import file_sha256, write_json
+
+INDEX_VERSION = 3
+
+
+def mutation_suffix(mutation: str) -> str:
+    """
+    Return the numeric+right-hand side of a mutation.
+    Example: R143G -> 143G, 627K -> 627K.
+    """
+    mutation = (mutation or "").strip().upper()
+    if not mutation:
+        return ""
+    for idx, char in enumerate(mutation):
+        if char.isdigit():
+            return mutation[idx:]
+    return mutation
+
+
+def rule_components(mutations) -> list:
+    """Distinct suffixes of a workbook mutation cell split on ';': 'H275Y;I436N' -> ['275Y', '436N']."""
+    if mutations is None:
+        return []
+    components = []
+    for part in str(mutations).split(';'):
+        suffix = mutation_suffix(part)
+        if suffix and suffix not in components:
+            components.append(suffix)
+    return components
+
+
+# -----------------------------------------
+# Compile
+# -----------------------------------------
+def compile_workbook(xlsx_file: str, sha256: str = None) -> dict:
+    """Read the workbook once and build the JSON-serialisable index."""
+    import pandas as pd
+
+    df = pd.read_excel(xlsx_file)
+    df = df.astype(object).where(df.notna(), None)
+
+    rules, index = [], {}
+    for values in df.itertuples(index=False):
+        row = dict(zip(df.columns, values))
+        segment, subtype = row.get('segment'), row.get('subtype')
+        components = rule_components(row.get('mutation'))
+        rule = len(rules)
+        rules.append({'row': row, 'components': components})
+        if segment is None:
+            continue
+        by_suffix = index.setdefault(str(segment), {}).setdefault('' if subtype is None else str(subtype), {})
+        for component, suffix in enumerate(components):
+            by_suffix.setdefault(suffix, []).append([rule, component])
+
+    return {
+        'version': INDEX_VERSION,
+        'source': os.path.basename(xlsx_file),
+        'sha256': sha256 or file_sha256(xlsx_file),
+        'columns': [str(c) for c in df.columns],
+        'rules': rules,
+        'index': index,
+    }
+
+
+def cache_path(xlsx_file: str, directory: str = None) -> str:
+    real = os.path.realpath(xlsx_file)
+    return os.path.join(directory or os.path.dirname(real), f".{os.path.basename(real)}.index.json")
+
+
+def load_index(xlsx_file: str) -> 'MutationIndex':
+    """The compiled index for a workbook, compiling (and caching) it when needed."""
+    sha256 = file_sha256(xlsx_file)
+    candidates = [cache_path(xlsx_file), cache_path(xlsx_file, os.getcwd())]
+    for path in candidates:
+        try:
+            with open(path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        if data.get('version') == INDEX_VERSION and data.get('sha256') == sha256:
+            return MutationIndex(data)
+
+    data = compile_workbook(xlsx_file, sha256)
+    for path in candidates:
+        try:
+            write_json(data, path)
+            break
+        except OSError:
+            continue
+    return MutationIndex(data)
+
+
+# -----------------------------------------
+# Lookup
+# -----------------------------------------
+class MutationIndex:
+    def __init__(self, data: dict):
+        self.data = data
+        self.rules = data['rules']
+        self._merged = {}
+
+    def suffix_map(self, segment: str, subtype: str = None) -> dict:
+        """suffix -> [rule id, component] for a segment and subtype (None: every subtype of the segment)."""
+        by_subtype = self.data['index'].get(segment, {})
+        if subtype is not None:
+            return by_subtype.get(subtype, {})
+        if segment not in self._merged:
+            merged = {}
+            for by_suffix in by_subtype.values():
+                for suffix, hits in by_suffix.items():
+                    merged.setdefault(suffix, []).extend(hits)
+            self._merged[segment] = merged
+        return self._merged[segment]
+
+    def rule_ids(self, segment: str, subtype: str = None) -> set:
+        return {rule for hits in self.suffix_map(segment, subtype).values() for rule, _ in hits}
+
+
+class RuleEngine:
+    """Several compiled rule tables, name -> (MutationIndex, any_subtype), evaluated together."""
+
+    def __init__(self, rule_sets: dict):
+        self.rule_sets = rule_sets
+        self._maps = {}
+
+    def suffix_map(self, segment: str, subtype: str) -> dict:
+        """Combined suffix -> [(rule set, rule id, component)] for a segment and subtype."""
+        if (segment, subtype) not in self._maps:
+            combined = {}
+            for name, (index, any_subtype) in self.rule_sets.items():
+                for suffix, hits in index.suffix_map(segment, None if any_subtype else subtype).items():
+                    combined.setdefault(suffix, []).extend((name, rule, component) for rule, component in hits)
+            self._maps[(segment, subtype)] = combined
+        return self._maps[(segment, subtype)]
+
+    def evaluate(self, mutations, segment: str, subtype: str) -> dict:
+        """
+        Rule set name -> (sample mutations of the matched rules in sample
+        order, ids of the rules that did not match). A rule matches when every
+        one of its components is hit by a sample mutation.
+        """
+        suffix_map = self.suffix_map(segment, subtype)
+        hits = {}
+        for mut in mutations:
+            for name, rule, component in suffix_map.get(mutation_suffix(mut), ()):
+                hits.setdefault((name, rule), {}).setdefault(component, set()).add(mut)
+
+        matched_rules = {name: set() for name in self.rule_sets}
+        matched_mutations = {name: set() for name in self.rule_sets}
+        for (name, rule), components in hits.items():
+            if len(components) == len(self.rule_sets[name][0].rules[rule]['components']):
+                matched_rules[name].add(rule)
+                for muts in components.values():
+                    matched_mutations[name].update(muts)
+
+        results = {}
+        for name, (index, any_subtype) in self.rule_sets.items():
+            matched = []
+            for mut in mutations:
+                if mut in matched_mutations[name] and mut not in matched:
+                    matched.append(mut)
+            rule_ids = index.rule_ids(segment, None if any_subtype else subtype)
+            results[name] = (matched, rule_ids - matched_rules[name])
+        return results
+
+
+def main() -> None:
+    for xlsx_file in sys.argv[1:]:
+        index = load_index(xlsx_file)
+        print(f"{xlsx_file}: {len(index.rules)} rules, sha256 {index.data['sha256'][:12]}")
+
+
+if __name__ == "__main__":
+    main()
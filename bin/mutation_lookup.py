@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Look up sample mutations in mutation-of-interest workbooks (rule tables).
+
+Every lookup of a run is evaluated in one process. Each --rules NAME=WORKBOOK
+is a rule table compiled by mutation_index.py; all tables are combined into
+one suffix map per (segment, subtype) and checked in a single pass over a
+sample's mutations. Rules listing several mutations ('H275Y;I436N') need all
+of them. The manifest is a TSV with a header:
+
+    sample  segment  subtype  mutation_file  mutation_type  [output]  [comparison]
+
+mutation_type names the rule table. Each row writes a CSV with Sample and
+'<segment> <mutation_type> mutations' (output defaults to
+<sample>_<segment>_<mutation_type>.csv). --run-table collects every lookup in
+one table: Sample, Segment, Subtype, Mutation type, Mutations, Output.
+A lookup that fails is reported on stderr and skipped; the other lookups of
+the run are still written and the exit status stays 0, so one bad sample
+does not discard the whole run's results.
+Mutation files are mutation_finder.py CSVs or long-format Parquet tables
+(mutation_finder.py --parquet). Rows with the same mutation source are read
+and evaluated once, and a Parquet file shared by several rows is loaded once.
+
+Usage:
+    mutation_lookup.py --rules inhibtion=Inhibtion_Mutations_of_Intrest_2324.xlsx \\
+        --rules mammalian=Mammalian_Mutations_of_Intrest_2324.xlsx --any-subtype mammalian \\
+        --manifest lookups.tsv --run-table run_lookup.tsv
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from mutation_index import RuleEngine, load_index
+
+MANIFEST_COLUMNS = ['sample', 'segment', 'subtype', 'mutation_file', 'mutation_type']
+RUN_TABLE_COLUMNS = ['Sample', 'Segment', 'Subtype', 'Mutation type', 'Mutations', 'Output']
+NO_MATCH = 'No matching mutations found'
+
+
+# -----------------------------------------
+# Sample mutations
+# -----------------------------------------
+def read_sample_mutations(mutations_file, sample_id, segment, comparison=None, tables=None):
+    """
+    (first sample, upper-case mutations) for a lookup. CSVs hold one sample
+    with a ';'-separated mutation string in the second column; Parquet tables
+    are filtered to the sample's substitutions in the segment (and comparison).
+    tables caches loaded Parquet files across calls.
+    """
+    if mutations_file.endswith('.parquet'):
+        import mutation_table
+
+        filters = {'Sample': sample_id, 'Protein': segment, 'Kind': 'sub'}
+        if comparison:
+            filters['Comparison'] = comparison
+        if tables is None:
+            rows = mutation_table.read_parquet(mutations_file, **filters)
+        else:
+            if mutations_file not in tables:
+                tables[mutations_file] = mutation_table.read_parquet(mutations_file, Kind='sub')
+            rows = tables[mutations_file]
+            keep = pd.Series(True, index=rows.index)
+            for name, value in filters.items():
+                keep &= rows[name] == value
+            rows = rows[keep]
+        return sample_id, [mut.upper() for mut in mutation_table.mutation_labels(rows)]
+
+    mutations_df = pd.read_csv(mutations_file)
+    if mutations_df.empty:
+        # mutation_finder.py writes a header-only CSV when no sequence was processed
+        return sample_id, []
+    first_sample = mutations_df.iloc[0, 0]
+    if pd.isna(mutations_df.iloc[0, 1]):
+        return first_sample, []
+    return first_sample, [mut.strip().upper() for mut in mutations_df.iloc[0, 1].split(';') if pd.notna(mut)]
+
+
+# -----------------------------------------
+# Lookup
+# -----------------------------------------
+def output_frame(matched, segment, mutation_type, sample_id, first_sample=None):
+    """
+    The CSV of one lookup: Sample and '<segment> <mutation_type> mutations'
+    with the matched sample mutations, or 'No matching mutations found'.
+    """
+    column = f"{segment} {mutation_type} mutations"
+    if matched:
+        return pd.DataFrame([{'Sample': sample_id, column: ';'.join(matched)}])
+    return pd.DataFrame([{column: NO_MATCH, 'Sample': sample_id if first_sample is None else first_sample}])
+
+
+def evaluate(engine, sample_mutations, segment, subtype, sample_id):
+    """Rule set name -> (matched mutations, unmatched rule ids) for one segment of a sample."""
+    # If segment is NA change to NA1 because of Excel formatting of NA
+    segment_look = "NA1" if segment == "NA" else segment
+    results = engine.evaluate(sample_mutations, segment_look, subtype)
+    for name, (_, unmatched_rules) in results.items():
+        if unmatched_rules and segment == "M2" and name.lower() == "inhibition":
+            print(f"No inhibition mutations found for M2 segment in samples: {[sample_id] * len(unmatched_rules)}")
+    return results
+
+
+def load_engine(rules, any_subtype=()):
+    """RuleEngine for NAME=WORKBOOK specs; rule sets named in any_subtype ignore the subtype."""
+    rule_sets = {}
+    for spec in rules:
+        name, sep, workbook = spec.partition('=')
+        if not sep or not name or not workbook:
+            raise ValueError(f"Rule table must be NAME=WORKBOOK, got {spec!r}")
+        rule_sets[name] = (load_index(workbook), name in any_subtype)
+    unknown = set(any_subtype) - set(rule_sets)
+    if unknown:
+        raise ValueError(f"--any-subtype names unknown rule tables: {', '.join(sorted(unknown))}")
+    return RuleEngine(rule_sets)
+
+
+def read_manifest(manifest_file):
+    manifest = pd.read_csv(manifest_file, sep='\t', dtype=str, keep_default_na=False)
+    missing = [c for c in MANIFEST_COLUMNS if c not in manifest.columns]
+    if missing:
+        raise ValueError(f"{manifest_file}: missing manifest columns {', '.join(missing)}")
+    if 'output' not in manifest.columns:
+        manifest['output'] = ''
+    if 'comparison' not in manifest.columns:
+        manifest['comparison'] = ''
+    blank = manifest['output'] == ''
+    manifest.loc[blank, 'output'] = (manifest['sample'] + '_' + manifest['segment'] + '_'
+                                     + manifest['mutation_type'] + '.csv')[blank]
+    return manifest
+
+
+def run_batch(manifest_file, engine, run_table=None):
+    """
+    Run every lookup of a manifest; rows sharing a mutation source (file,
+    sample, segment, subtype, comparison) are read and evaluated once against
+    all rule tables. Returns the number of failed lookups.
+    """
+    manifest = read_manifest(manifest_file)
+    source = ['mutation_file', 'sample', 'segment', 'subtype', 'comparison']
+    tables, rows, failed = {}, [], 0
+
+    for (mutations_file, sample_id, segment, subtype, comparison), group in manifest.groupby(source, sort=False):
+        try:
+            first_sample, sample_mutations = read_sample_mutations(
+                mutations_file, sample_id, segment, comparison or None, tables)
+            results = evaluate(engine, sample_mutations, segment, subtype, sample_id)
+        except Exception as e:
+            failed += len(group)
+            print(f"Lookup failed for {mutations_file}: {e}", file=sys.stderr)
+            continue
+
+        for lookup_row in group.itertuples(index=False):
+            if lookup_row.mutation_type not in results:
+                failed += 1
+                print(f"Lookup failed for {mutations_file}: no rule table named {lookup_row.mutation_type!r}",
+                      file=sys.stderr)
+                continue
+            matched, _ = results[lookup_row.mutation_type]
+            df_output = output_frame(matched, segment, lookup_row.mutation_type, sample_id, first_sample)
+            df_output.to_csv(lookup_row.output, index=False)
+            print(f"Results written to {lookup_row.output}")
+            rows.append({
+                'Sample': df_output['Sample'].iloc[0],
+                'Segment': segment,
+                'Subtype': subtype,
+                'Mutation type': lookup_row.mutation_type,
+                'Mutations': ';'.join(matched) if matched else NO_MATCH,
+                'Output': lookup_row.output,
+            })
+
+    if run_table:
+        pd.DataFrame(rows, columns=RUN_TABLE_COLUMNS).to_csv(run_table, sep='\t', index=False)
+        print(f"Run table written to {run_table}")
+    print(f"{len(manifest) - failed}/{len(manifest)} lookups done")
+    return failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Look up sample mutations in mutation-of-interest workbooks")
+    parser.add_argument("--rules", action="append", required=True, metavar="NAME=WORKBOOK",
+                        help="Rule table (XLSX) for manifest rows with mutation_type NAME; repeatable")
+    parser.add_argument("--any-subtype", action="append", default=[], metavar="NAME",
+                        help="Match rules of every subtype for this rule table (e.g. mammalian); repeatable")
+    parser.add_argument("--manifest", required=True,
+                        help="TSV: sample, segment, subtype, mutation_file, mutation_type[, output, comparison]")
+    parser.add_argument("--run-table", help="Write every lookup of the run to this TSV")
+    args = parser.parse_args()
+
+    engine = load_engine(args.rules, args.any_subtype)
+    failed = run_batch(args.manifest, engine, args.run_table)
+    if failed:
+        print(f"{failed} lookups failed, see the messages above", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Long-format mutation table shared by mutation_finder.py and the table lookups.
+
+One row per (sample record, protein, comparison, reference position):
+
+    Sample  Record  Segment  Protein  Comparison  Reference  Position  Ref  Alt  Kind
+
+Kind is match, sub, del or ins; an ins row carries the reference position it
+precedes and all inserted residues in Alt, a del row has Alt '-'. The
+semicolon strings of the wide CSVs (Differences, All_Positions) are views of
+this table (see views()), so consumers that load the table never need to
+parse them.
+
+Parquet files use dictionary-encoded strings and typed positions; pyarrow is
+only imported for Parquet I/O. Reading one sample's HA substitutions:
+
+    read_parquet('S1_mutations.parquet', Protein='HA', Kind='sub')
+"""
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['Sample', 'Record', 'Segment', 'Protein', 'Comparison', 'Reference', 'Position', 'Ref', 'Alt', 'Kind']
+KINDS = ['match', 'sub', 'del', 'ins']
+
+# Protein / CDS names used for the translations -> genome segment
+PROTEIN_SEGMENTS = {
+    'HA1': 'HA',
+    'HA2': 'HA',
+    'M1': 'MP',
+    'M2': 'MP',
+    'BM2': 'MP',
+    'NS1': 'NS',
+    'NS2': 'NS',
+    'NEP': 'NS',
+    'PA-X': 'PA',
+    'PB1-F2': 'PB1',
+    'NB': 'NA',
+}
+
+DICTIONARY_COLUMNS = ['Segment', 'Protein', 'Comparison', 'Reference', 'Ref', 'Kind']
+
+
+def segment_of_protein(protein: str) -> str:
+    return PROTEIN_SEGMENTS.get(protein, protein)
+
+
+def empty() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=np.int32 if c == 'Position' else object) for c in COLUMNS})
+
+
+def from_diffs(pairs, protein: str, comparison: str) -> pd.DataFrame:
+    """Table for (record ID, reference ID, mutation_finder.alignment_diffs array) pairs."""
+    frames = [
+        pd.DataFrame({
+            'Sample': record_id.split('|', 1)[0],
+            'Record': record_id,
+            'Segment': segment_of_protein(protein),
+            'Protein': protein,
+            'Comparison': comparison,
+            'Reference': reference_id,
+            'Position': diffs['ref_pos'].astype(np.int32),
+            'Ref': diffs['ref'].astype(object),
+            'Alt': diffs['alt'].astype(object),
+            'Kind': diffs['kind'].astype(object),
+        }, columns=COLUMNS)
+        for record_id, reference_id, diffs in pairs
+    ]
+    if not frames:
+        return empty()
+    return pd.concat(frames, ignore_index=True)
+
+
+def mutation_labels(table: pd.DataFrame) -> pd.Series:
+    """K140R style labels (K140- for deletions, ins140KR for insertions)."""
+    pos = table['Position'].astype(str).astype(object)
+    labels = table['Ref'] + pos + table['Alt']
+    ins = table['Kind'] == 'ins'
+    return labels.mask(ins, 'ins' + pos + table['Alt'])
+
+
+def views(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    The wide strings, one row per (Record, Reference) in table order:
+    Differences (substitutions, 'No mutations found' when there are none) and
+    All_Positions (every reference position: K12R, K12K, K12-).
+    """
+    labels = mutation_labels(table)
+    frame = pd.DataFrame({
+        'Record': table['Record'],
+        'Reference': table['Reference'],
+        'Sample': table['Sample'],
+        'Differences': labels.where(table['Kind'] == 'sub'),
+        'All_Positions': labels.where(table['Kind'] != 'ins'),
+    })
+    out = frame.groupby(['Record', 'Reference'], sort=False).agg(
+        Sample=('Sample', 'first'),
+        Differences=('Differences', lambda s: ';'.join(s.dropna())),
+        All_Positions=('All_Positions', lambda s: ';'.join(s.dropna())),
+    ).reset_index()
+    out['Differences'] = out['Differences'].replace('', 'No mutations found')
+    return out
+
+
+def report_columns(table: pd.DataFrame) -> pd.DataFrame:
+    """One row per sample with the '<protein> Differences <comparison>' columns of the report CSVs."""
+    wide = []
+    for (protein, comparison), part in table.groupby(['Protein', 'Comparison'], sort=False):
+        view = views(part).drop_duplicates('Sample').set_index('Sample')
+        wide.append(view[['Differences', 'Reference']].rename(columns={
+            'Differences': f"{protein} Differences {comparison}",
+            'Reference': f"{protein} Reference {comparison}",
+        }))
+    if not wide:
+        return pd.DataFrame(columns=['Sample'])
+    return pd.concat(wide, axis=1).reset_index()
+
+
+# -----------------------------------------
+# Parquet
+# -----------------------------------------
+def write_parquet(table: pd.DataFrame, path: str) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrays, fields = [], []
+    for name in COLUMNS:
+        if name == 'Position':
+            arrays.append(pa.array(table[name].to_numpy(), type=pa.int32()))
+        elif name in DICTIONARY_COLUMNS:
+            arrays.append(pa.array(table[name].tolist(), type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(table[name].tolist(), type=pa.string()))
+        fields.append(pa.field(name, arrays[-1].type))
+    pq.write_table(pa.Table.from_arrays(arrays, schema=pa.schema(fields)), path)
+
+
+def read_parquet(paths, **equal) -> pd.DataFrame:
+    """Load one or more mutation tables, keeping rows whose columns equal the given values."""
+    import pyarrow.dataset as ds
+
+    expr = None
+    for name, value in equal.items():
+        cond = ds.field(name) == value
+        expr = cond if expr is None else expr & cond
+    table = ds.dataset(paths, format='parquet').to_table(filter=expr).to_pandas()
+    # strings arrive as categoricals (dictionary-encoded) or string dtype;
+    # return object columns as from_diffs() does
+    return table.astype({c: object for c in table.columns if c != 'Position'})
@@ -6,9 +6,19 @@ Adds two columns:
 
 1. NGS_QC_Sum – segment-wise QC issues, e.g. HA:MS|PB1:LC,FS|NP:LC
 2. GISAID_Comment – "Review" when any QC issues are present, else "NA".
+
+Mixed sites (MS) come from the Nextclade mixed-site counts by default, or from
+the minor_variant_caller.py summary columns with --mixed-source depth.
+
+The rules are evaluated a whole column at a time: each segment's FS/LC/MS
+flags are boolean masks over the report, packed into a 3-bit code that
+indexes that segment's summary labels.
 """
 import argparse
+import re
 from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
 # -----------------------------------------
@@ -47,73 +57,117 @@ MIXED_COLS = {
     'PB2': ['Nextclade Mixed Sites PB2'],
 }
 
+MINOR_VARIANT_COLS = {
+    'HA': ['Minor Variant Sites HA'],
+    'NA': ['Minor Variant Sites NA'],
+    'MP': ['Minor Variant Sites MP'],
+    'NP': ['Minor Variant Sites NP'],
+    'NS': ['Minor Variant Sites NS'],
+    'PA': ['Minor Variant Sites PA'],
+    'PB1': ['Minor Variant Sites PB1'],
+    'PB2': ['Minor Variant Sites PB2'],
+}
+
+MIXED_SOURCES = {
+    'nextclade': MIXED_COLS,
+    'depth': MINOR_VARIANT_COLS,
+}
+
 SEGMENT_ORDER = ['HA', 'NA', 'MP', 'NP', 'NS', 'PA', 'PB1', 'PB2']
 
+# Issue codes in summary order; bit i of a segment's code is ISSUES[i]
+ISSUES = ['FS', 'LC', 'MS']
+
+# Invisible spaces turned into plain spaces before stripping, and the
+# empty-like tokens read as missing
+INVISIBLE_SPACES = str.maketrans({'\u00A0': ' ', '\u200B': ' ', '\uFEFF': ' '})
+EMPTY_TOKENS = re.compile(r'(?:na|nan|none|null|n/?a|-)?', re.IGNORECASE)
+
 
 # -----------------------------------------
 # Core summarisation logic
 # -----------------------------------------
-def qc_summary(row: pd.Series) -> str:
-    """Return QC summary string for one row."""
-    segments_out = []
+def numeric(df: pd.DataFrame, col: str) -> pd.Series:
+    """Column coerced to numbers; NaN where missing, non-numeric or absent from the report."""
+    if col not in df:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[col], errors='coerce')
+
+
+def frameshift_mask(df: pd.DataFrame, seg: str) -> np.ndarray:
+    """Any frameshift column not equal 'No frameShifts' (case/space-insensitive)."""
+    mask = np.zeros(len(df), dtype=bool)
+    for col in FRAMESHIFT_COLS[seg]:
+        if col in df:
+            values = df[col]
+            mask |= (values.notna() & (values.astype(str).str.strip().str.lower() != 'no frameshifts')).to_numpy()
+    return mask
+
+
+def low_coverage_mask(df: pd.DataFrame, seg: str) -> np.ndarray:
+    cov = numeric(df, COVERAGE_COL[seg])
+    return ((cov > 0.1) & (cov < 80)).to_numpy()
+
+
+def mixed_sites_mask(df: pd.DataFrame, seg: str, mixed_cols: dict = MIXED_COLS) -> np.ndarray:
+    """More than 3 mixed sites summed over the segment's columns."""
+    ms_sum = 0.0
+    for col in mixed_cols[seg]:
+        ms_sum = ms_sum + numeric(df, col).fillna(0.0)
+    return (pd.Series(ms_sum, index=df.index) > 3).to_numpy()
+
+
+def segment_labels(seg: str) -> np.ndarray:
+    """Summary label of each issue code, '|'-prefixed so labels concatenate."""
+    labels = ['']
+    for code in range(1, 1 << len(ISSUES)):
+        issues = [issue for bit, issue in enumerate(ISSUES) if code >> bit & 1]
+        labels.append(f"|{seg}:{','.join(issues)}")
+    return np.array(labels, dtype=object)
+
+
+def qc_summary(df: pd.DataFrame, mixed_cols: dict = MIXED_COLS) -> pd.Series:
+    """QC summary string of every row, e.g. HA:MS|PB1:FS,LC|NP:LC."""
+    summary = np.full(len(df), '', dtype=object)
     for seg in SEGMENT_ORDER:
-        issues = []
-
-        # Frameshift: any column not equal 'No frameShifts' (case/space-insensitive)
-        for col in FRAMESHIFT_COLS[seg]:
-            val = row.get(col)
-            if pd.isna(val):
-                continue
-            if str(val).strip().lower() != 'no frameshifts':
-                issues.append('FS')
-                break
-
-        # Low coverage: coerce to numeric first
-        cov_raw = row.get(COVERAGE_COL[seg])
-        cov_val = pd.to_numeric(cov_raw, errors='coerce')
-        if pd.notna(cov_val) and (cov_val > 0.1) and (cov_val < 80):
-            issues.append('LC')
-
-        # Mixed sites: coerce each to numeric and sum
-        ms_sum = 0.0
-        for col in MIXED_COLS[seg]:
-            v = pd.to_numeric(row.get(col), errors='coerce')
-            if pd.notna(v):
-                ms_sum += float(v)
-        if ms_sum > 3:
-            issues.append('MS')
-
-        if issues:
-            segments_out.append(f"{seg}:{','.join(sorted(issues))}")
-
-    return '|'.join(segments_out)
-
-
-def process_file(in_csv: Path, out_csv: Path) -> None:
-    # Read and normalize blanks to <NA>
-    df = pd.read_csv(in_csv, low_memory=False)
-    obj_cols = df.select_dtypes(include='object').columns
-    if len(obj_cols):
-        # strip spaces and normalize common empty-like tokens to NA
-        df[obj_cols] = df[obj_cols].apply(lambda s: s.str.replace(r'[\u00A0\u200B\uFEFF]', ' ', regex=True).str.strip())
-        df[obj_cols] = df[obj_cols].replace(
-            to_replace=r'^(?i)(?:na|nan|none|null|n/?a|-)?$',
-            value=pd.NA,
-            regex=True
+        code = (
+            frameshift_mask(df, seg).astype(np.intp)
+            | low_coverage_mask(df, seg) << 1
+            | mixed_sites_mask(df, seg, mixed_cols) << 2
         )
-        df = df.replace(r'^\s*$', pd.NA, regex=True)
+        summary = summary + segment_labels(seg)[code]
+    return pd.Series(summary, index=df.index, dtype=object).str[1:]
 
-    # Build QC summary
-    df['NGS_QC_Sum'] = df.apply(qc_summary, axis=1)
 
-    # If no issues, make it an empty string instead of "NA"
-    df['NGS_QC_Sum'] = df['NGS_QC_Sum'].replace(r'^\s*$', '', regex=True)
+def clean_value(value):
+    """Object cell with invisible spaces and padding stripped; empty-like tokens and non-strings as NA."""
+    if not isinstance(value, str):
+        return pd.NA
+    value = value.translate(INVISIBLE_SPACES).strip()
+    return pd.NA if EMPTY_TOKENS.fullmatch(value) else value
 
-    # GISAID comment: "Review" if any issues, else empty string
-    df['GISAID_Comment'] = df['NGS_QC_Sum'].apply(lambda x: 'Review' if str(x).strip() else '')
 
+def normalize_blanks(df: pd.DataFrame) -> pd.DataFrame:
+    """Clean every object column, each distinct value once."""
+    obj_cols = df.select_dtypes(include='object').columns
+    if len(obj_cols):
+        values = df[obj_cols].to_numpy(dtype=object)
+        codes, uniques = pd.factorize(values.ravel())
+        cleaned = np.array([clean_value(v) for v in uniques] + [pd.NA], dtype=object)
+        df[obj_cols] = pd.DataFrame(cleaned[codes].reshape(values.shape), index=df.index, columns=obj_cols)
+    return df
 
 
+def process_file(in_csv: Path, out_csv: Path, mixed_source: str = 'nextclade') -> None:
+    # Read and normalize blanks to <NA>
+    df = normalize_blanks(pd.read_csv(in_csv, low_memory=False))
+
+    # Build QC summary
+    df['NGS_QC_Sum'] = qc_summary(df, MIXED_SOURCES[mixed_source])
+
+    # GISAID comment: "Review" if any issues, else empty string
+    df['GISAID_Comment'] = np.where(df['NGS_QC_Sum'] != '', 'Review', '')
+
     # Write with NA shown explicitly
     df.to_csv(out_csv, index=False, na_rep='NA')
     print(f"Wrote processed file to {out_csv}")  # noqa: T201
@@ -133,10 +187,16 @@ def main() -> None:
         type=Path,
         help="Output CSV file (default: <input>_processed.csv)",
     )
+    parser.add_argument(
+        "--mixed-source",
+        choices=sorted(MIXED_SOURCES),
+        default='nextclade',
+        help="Mixed-site counts for the MS flag: Nextclade or minor_variant_caller.py (default: nextclade)",
+    )
     args = parser.parse_args()
 
     out_path = args.output or args.input.with_name(f"{args.input.stem}_processed.csv")
-    process_file(args.input, out_path)
+    process_file(args.input, out_path, args.mixed_source)
 
 
 if __name__ == "__main__":
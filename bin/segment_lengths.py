@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Expected segment lengths derived from the segment references
+(assets/sequence_references/references_2324.fasta).
+
+Every reference is named <type>_<subtype>_<segment> (A_H3_HA, A_N2_NA,
+A_XX_MP, B_VIC_HA) and its length is the expected length for that key; a
+key listed twice keeps the longer reference. Each (type, segment) also gets
+a wildcard entry, the longest reference of any subtype, used for subtypes
+without their own reference. The table is cached next to the FASTA as
+.<fasta>.lengths.json (or in the working directory when that is not
+writable) and rebuilt whenever the SHA-256 of the FASTA changes.
+
+A sample's segment and subtype as used in the pipeline ('HA', 'H3N2';
+'M', 'VICVIC') resolve to a key with reference_key(); HA and the internal
+segments use the H subtype, NA the N subtype and M/MP the shared A_XX_MP
+reference:
+
+    lengths = load_lengths('references_2324.fasta')
+    lengths.expected('NA', 'H3N2')    # 1410 (A_N2_NA)
+    lengths.expected('NP', 'H5N1')    # 1525 (no A_H5_NP: longest A NP)
+
+The bundled references only hold HA and NA for influenza B (B_VIC_HA,
+B_VIC_NA), so the B MP, NP, NS, PA, PB1 and PB2 segments have no expected
+length and expected() returns the default; coverage_finder.py then warns and
+falls back to the sequence length.
+
+Usage: segment_lengths.py <references.fasta> [...]   (build ahead of time, print the table)
+"""
+import json
+import os
+import re
+import sys
+from typing import Optional
+
+from fastx import read_fasta
+from cache_io import file_sha256, write_json
+
+LENGTHS_VERSION = 1
+ANY_SUBTYPE = '*'
+INFLUENZA_B_LINEAGES = ('VIC', 'YAM')
+
+
+def reference_key(segment: str, subtype: str) -> tuple:
+    """(type, subtype, segment) reference key for a sample segment, e.g. ('NA', 'H3N2') -> ('A', 'N2', 'NA')."""
+    segment = segment.upper()
+    subtype = (subtype or '').upper()
+    if segment == 'M':
+        segment = 'MP'
+    lineage = subtype[:3]
+    if lineage in INFLUENZA_B_LINEAGES:
+        return 'B', lineage, segment
+    if segment == 'MP':
+        return 'A', 'XX', segment
+    match = re.search(r'N\d+' if segment == 'NA' else r'H\d+', subtype)
+    return 'A', match.group(0) if match else '', segment
+
+
+def compile_lengths(fasta_file: str, sha256: Optional[str] = None) -> dict:
+    lengths = {}
+    for record_id, seq in read_fasta(fasta_file):
+        fields = record_id.decode().split('_')
+        if len(fields) != 3:
+            continue
+        for key in ('_'.join(fields), f"{fields[0]}_{ANY_SUBTYPE}_{fields[2]}"):
+            lengths[key] = max(lengths.get(key, 0), len(seq))
+    return {
+        'version': LENGTHS_VERSION,
+        'sha256': sha256 or file_sha256(fasta_file),
+        'source': os.path.basename(fasta_file),
+        'lengths': lengths,
+    }
+
+
+def cache_path(fasta_file: str, directory: Optional[str] = None) -> str:
+    real = os.path.realpath(fasta_file)
+    return os.path.join(directory or os.path.dirname(real), f".{os.path.basename(real)}.lengths.json")
+
+
+def load_lengths(fasta_file: str) -> 'SegmentLengths':
+    """The length table for a reference FASTA, building (and caching) it when needed."""
+    sha256 = file_sha256(fasta_file)
+    candidates = [cache_path(fasta_file), cache_path(fasta_file, os.getcwd())]
+    for path in candidates:
+        try:
+            with open(path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        if data.get('version') == LENGTHS_VERSION and data.get('sha256') == sha256:
+            return SegmentLengths(data)
+
+    data = compile_lengths(fasta_file, sha256)
+    for path in candidates:
+        try:
+            write_json(data, path)
+            break
+        except OSError:
+            continue
+    return SegmentLengths(data)
+
+
+# -----------------------------------------
+# Lookup
+# -----------------------------------------
+class SegmentLengths:
+    def __init__(self, data: dict):
+        self.data = data
+        self.lengths = {tuple(key.split('_')): length for key, length in data['lengths'].items()}
+
+    def expected(self, segment: str, subtype: str, default: Optional[int] = None) -> Optional[int]:
+        """Expected length of a sample segment: its own reference, else the longest of its type, else default."""
+        flu_type, subtype_key, segment_key = reference_key(segment, subtype)
+        length = self.lengths.get((flu_type, subtype_key, segment_key))
+        if length is None:
+            length = self.lengths.get((flu_type, ANY_SUBTYPE, segment_key), default)
+        return length
+
+
+def main() -> None:
+    for fasta_file in sys.argv[1:]:
+        table = load_lengths(fasta_file)
+        print(f"{fasta_file}: {len(table.lengths)} keys, sha256 {table.data['sha256'][:12]}")
+        for key, length in sorted(table.lengths.items()):
+            print(f"  {'_'.join(key)}\t{length}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Segment names of IRMA references, shared by the depth, coverage and dropout
+scripts in bin/.
+
+A reference is named <type>_<segment>[_<subtype>] (A_HA_H3, A_MP, B_NA) and
+its segment is the second field: A_HA_H3 -> HA, A_MP -> MP. COVERAGE
+(coverage_finder.py) names the matrix segment M, so tables merged into the
+same report as its Coverage-<segment> columns ask for coverage_style names.
+"""
+
+# Segment names that differ in the COVERAGE columns
+COVERAGE_NAMES = {'MP': 'M'}
+
+
+def segment_of(reference: str, coverage_style: bool = False) -> str:
+    """Segment name of an IRMA reference, e.g. A_HA_H3 -> HA, B_NA -> NA, A_MP -> MP (M with coverage_style)."""
+    parts = str(reference).split('_')
+    segment = parts[1] if len(parts) > 1 else parts[0]
+    return COVERAGE_NAMES.get(segment, segment) if coverage_style else segment
+
+
+def segments_of(references, coverage_style: bool = False):
+    """segment_of over a pandas Series of references, computed once per distinct reference."""
+    names = {ref: segment_of(ref, coverage_style) for ref in references.unique()}
+    return references.map(names)
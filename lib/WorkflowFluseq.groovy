@@ -17,6 +17,15 @@ class WorkflowFluseq {
         }
     }
 
+    //
+    // One TABLELOOKUP / TABLELOOKUP_MAMMALIAN input for a whole run from the
+    // collected [meta, mutation file(s), subtype file] rows: the rows and every
+    // mutation file to stage
+    //
+    public static List lookupBatch(List rows) {
+        return [rows, rows.collect { it[1] }.flatten()]
+    }
+
     //
     // Get workflow summary for MultiQC
     //
@@ -0,0 +1,35 @@
+process BAM_COVERAGE {
+    tag "$meta.id"
+    label 'process_single'
+    errorStrategy 'ignore'
+
+    container 'docker.io/rasmuskriis/nextclade-python'
+    containerOptions = "-v ${baseDir}/bin:/project-bin" // Mount the bin directory
+
+    input:
+    tuple val(meta), path(bam), path(bai)
+
+    output:
+    tuple val(meta), path("*_bam_coverage.csv"), emit: bam_coverage
+    path("*_bam_coverage.csv")                 , emit: coverage_report
+    path "versions.yml"                        , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    def args = task.ext.args ?: ''
+
+    """
+    python3 /project-bin/bam_coverage.py \
+                ${meta.id} \
+                ${bam} \
+                --threads ${task.cpus} \
+                ${args}
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python3 --version 2>&1)
+    END_VERSIONS
+    """
+}
@@ -15,7 +15,8 @@ process BASERATIO {
     
     output:
 
-    path("*.csv"), emit: report
+    path("depth_report.csv*"), emit: report, optional: true
+    path("depth_report.parquet"), emit: parquet, optional: true
     path "versions.yml", emit: versions
 
 
@@ -25,8 +26,10 @@ process BASERATIO {
 
 
     script:
+    def args = task.ext.args ?: ''
+
     """ 
-    python /project-bin/depth_analysis_merge.py 
+    python /project-bin/depth_analysis_merge.py ${args}
 
         cat <<-END_VERSIONS > versions.yml
     "${task.process}":
@@ -25,14 +25,21 @@ process DEPTH_ANALYSIS {
    
 
     output:
-    path("*_long.csv") , emit: depth_report
+    path("*_{long,compact}.csv") , emit: depth_report, optional: true
+    path("*_depth.parquet")      , emit: depth_parquet, optional: true
+    path("*_depth_rle.tsv")      , emit: depth_rle, optional: true
+    path("*_depth_pyramid.tsv")  , emit: depth_pyramid, optional: true
 
     when:
     task.ext.when == null || task.ext.when
 
     script:
+    def args = task.ext.args ?: ''
+
     """
     python3 /project-bin/depth_analysis.py  \
-                ${meta.id}   
+                ${meta.id} \
+                --threads ${task.cpus} \
+                ${args}
     """
 }
\ No newline at end of file
@@ -0,0 +1,29 @@
+process DEPTH_PYRAMID {
+    label 'process_single'
+    errorStrategy 'ignore'
+
+    container 'docker.io/rasmuskriis/blast_python_pandas:amd64'
+    containerOptions = "-v ${baseDir}/bin:/project-bin" // Mount the bin directory
+
+    input:
+    path(depth_pyramid)
+
+    output:
+    path("depth_pyramid.tsv*"), emit: pyramid
+    path "versions.yml"       , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    def args = task.ext.args ?: ''
+
+    """
+    python /project-bin/depth_analysis_merge.py --pyramid ${args}
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python --version 2>&1)
+    END_VERSIONS
+    """
+}
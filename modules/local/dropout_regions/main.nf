@@ -0,0 +1,30 @@
+process DROPOUT_REGIONS {
+    label 'process_single'
+    errorStrategy 'ignore'
+
+    container 'docker.io/rasmuskriis/blast_python_pandas:amd64'
+    containerOptions = "-v ${baseDir}/bin:/project-bin" // Mount the bin directory
+
+    input:
+    path(depth_rle)
+
+    output:
+    path("dropout_regions.tsv")   , emit: regions
+    path("dropout_recurrence.tsv"), emit: recurrence
+    path "versions.yml"           , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    def args = task.ext.args ?: ''
+
+    """
+    python /project-bin/dropout_regions.py ${args}
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python --version 2>&1)
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,40 @@
+process MINORVARIANTS {
+    label 'process_single'
+    errorStrategy 'ignore'
+
+
+
+    //conda "bioconda::blast=2.15.0"
+    container 'docker.io/rasmuskriis/blast_python_pandas:amd64'
+    containerOptions = "-v ${baseDir}/bin:/project-bin" // Mount the bin directory
+
+    input:
+    path(depth)
+
+
+    output:
+
+    path("minor_variants.csv"), emit: variants
+    path("minor_variants_summary.csv"), emit: summary
+    path "versions.yml", emit: versions
+
+
+
+    when:
+    task.ext.when == null || task.ext.when
+
+
+    script:
+    def args = task.ext.args ?: ''
+
+    """ 
+    python /project-bin/minor_variant_caller.py ${args}
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python --version 2>&1)
+    END_VERSIONS
+
+    """
+
+}
@@ -27,6 +27,7 @@ process MUTATION {
     path("*inhibtion_mutation_report.csv"), emit: inhibtion_mutation_report
     path("*vaccine_mutation_report.csv"), emit: vaccine_mutation_report, optional: true
     path("*full_mutation_list_report.csv"), emit: full_mutation_list_report
+    tuple val(meta), path("*_mutations.parquet"), emit: mutation_table, optional: true
 
     path "versions.yml", emit: versions
 
@@ -50,82 +51,21 @@ process MUTATION {
     """
     subtype_name=\$(cat ${subtype} )
 
-    for fasta_file in ${fasta}; do
-
-        filename=\$(basename \$fasta_file)
-        echo "Filename: \${filename}"
-
-        filename_no_ext=\${filename%.*}  
-        echo "Filename no ext: \${filename_no_ext}"
-
-        # Extract 'A_H5_HA' assuming it's after the last '.' in the filename_no_ext
-        segment_subtype=\$(echo "\${filename_no_ext}" | awk -F. '{print \$NF}')
-        echo "Segment subtype: \${segment_subtype}"
-
-        # Extract 'HA' as the segment assuming it's after the last '_' in segment_subtype
-        segment=\$(echo "\${segment_subtype}" | awk -F_ '{print \$NF}')
-
-        # Make output name
-        output_name_mamailian=${meta.id}_\${segment}"_mamailian_mutation.csv"
-        output_name_inhibition=${meta.id}_\${segment}"_inhibtion_mutation.csv"
-        output_name_vaccine=${meta.id}_\${segment}"_vaccine_mutation.csv"
-
-        reference_file=${sequence_references}
-        mamailian=mamailian
-        inhibition=inhibition
-        human_vaccine=human_vaccine
-
-        python /project-bin/mutation_finder.py \
-            \$fasta_file \
-            \$reference_file \
-            \${segment} \
-            \$subtype_name \
-            \$output_name_mamailian\
-            \$mamailian\
-
-        
-        if [[ ( "\${segment}" == *"NA"* || ( "\${segment}" == *"PA"* && "\${segment}" != *"PA-X"* ) || "\${segment}" == *"M2"* ) && "\${segment}" != *"BM2"* ]]; then
-
-
-
-        echo "Executing inhibition mutation finder for NA/PA/M2 segment: \${segment}"
-
-
-
-        python /project-bin/mutation_finder.py \
-            \$fasta_file \
-            \$reference_file \
-            \${segment} \
-            \$subtype_name \
-            \$output_name_inhibition\
-            \$inhibition
-
-        else
-            echo "Skipping inhibition call for segment not matching NA, PA (non PA-X) or M2: \${segment}"
-        fi
-
-        if [[ ( "\${segment}" == *"HA"* || "\${segment}" == *"NA"* ) && ( "\${subtype_name}" == "H5N1" || "\${subtype_name}" == "H5N5" ) ]]; then
-
-
-
-        echo "Executing vaccine mutation finder for subtype \${subtype_name} segment: \${segment}"
-
-
-
-        python /project-bin/mutation_finder.py \
-            \$fasta_file \
-            \$reference_file \
-            \${segment} \
-            \$subtype_name \
-            \$output_name_vaccine\
-            \$human_vaccine
-
-        else
-            echo "Skipping vaccine call for subtype/segment combination: \${subtype_name} / \${segment}"
-        fi
-        
-    done
-    
+    # Vaccine comparisons only for H5N1/H5N5; inhibition is limited to NA, PA and M2 by mutation_finder.py
+    comparison_types=mamailian,inhibition
+    if [[ "\${subtype_name}" == "H5N1" || "\${subtype_name}" == "H5N5" ]]; then
+        comparison_types=\${comparison_types},human_vaccine
+    fi
+
+    python /project-bin/mutation_finder.py \
+        --batch \
+        --sample ${meta.id} \
+        --subtype \$subtype_name \
+        --references ${sequence_references} \
+        --types \$comparison_types \
+        --threads ${task.cpus} \
+        ${args} \
+        ${fasta}
 
 
 
@@ -25,6 +25,7 @@ process MUTATIONHUMAN  {
     path("*human_mutation_report.csv"), emit: human_mutation_report, optional: true
     path("*inhibtion_mutation_report.csv"), emit: inhibtion_mutation_report, optional: true
     path("*vaccine_mutation_report.csv"), emit: vaccine_mutation_report, optional: true
+    tuple val(meta), path("*_mutations.parquet"), emit: mutation_table, optional: true
 
     path "versions.yml", emit: versions
 
@@ -54,93 +55,17 @@ process MUTATIONHUMAN  {
     fi
     
 
-    for fasta_file in ${fasta}; do
-
-        filename=\$(basename \$fasta_file)
-        filename_no_ext=\${filename%.*}  
-
-        # Extract 'A_XX_XX' assuming it's after the last '.' in the filename_no_ext
-        segment_subtype=\$(echo "\${filename_no_ext}" | awk -F. '{print \$NF}')
-  
-        # Extract 'XX' as the segment assuming it's after the last '_' in segment_subtype
-        segment=\$(echo "\${segment_subtype}" | awk -F_ '{print \$NF}')
-
-        # Make output name
-        output_name_human=${meta.id}_\${segment}"_human_mutation.csv"
-        output_name_mamailian=${meta.id}_\${segment}"_mamailian_mutation.csv"
-        output_name_inhibition=${meta.id}_\${segment}"_inhibtion_mutation.csv"
-        output_name_vaccine=${meta.id}_\${segment}"_vaccine_mutation.csv"
-
-        reference_file=${sequence_references}
-
-        mamailian=mamailian
-        inhibition=inhibition
-        human=human
-        inhibition_human=inhibition_human
-        human_vaccine=human_vaccine
-
-        # HUMAN MUTATIONS - DEFAULT
-
-        if [[ "\${segment}" != *"NEP"* && "\${segment}" != *"PA-X"* && "\${segment}" != *"PB1-F2"* && "\${segment}" != *"BM2"* ]]; then 
-
-            python /project-bin/mutation_finder.py \
-                \$fasta_file \
-                \$reference_file \
-                \${segment} \
-                \$subtype_name \
-                \$output_name_human\
-                \$human\
-
-        else
-            echo "Skipping execution for a segment containing 'NEP' or 'PA-X' in its name: \${segment}"
-        fi
-
-        echo "OK1"
-
-
-        
-
-        # HUMAN MUTATIONS - INHIBTION
-
-        if [[ ( "\${segment}" == *"NA"* || ( "\${segment}" == *"PA"* && "\${segment}" != *"PA-X"* ) || "\${segment}" == *"M2"* ) && "\${segment}" != *"BM2"* ]]; then
-
-
-            python /project-bin/mutation_finder.py \
-                \$fasta_file \
-                \$reference_file \
-                \${segment} \
-                \$subtype_name \
-                \$output_name_inhibition\
-                \$inhibition_human
-
-        else
-            echo "Skipping execution for a segment not containing 'NA', 'M' or 'PA' in its name: \${segment}"
-        fi
-
-        echo "OK2"
-
-        # HUMAN MUTATIONS - VACCINE
-        
-        if [[ ("\${segment}" == *"HA"* || "\${segment}" == *"NA"*) ]]; then
-
-        python /project-bin/mutation_finder.py \
-            \$fasta_file \
-            \$reference_file \
-            \${segment} \
-            \$subtype_name \
-            \$output_name_vaccine\
-            \$human_vaccine
-
-
-
-        else
-            echo "Skipping execution for a segmentcontaining 'HA' or'NA' in its name: \${segment}"
-        fi
-
-        echo "OK3"
-        
-    done
-    
+    # Segment restrictions per comparison type (no NEP/PA-X/PB1-F2/BM2 for human,
+    # NA/PA/M2 for inhibition, HA/NA for vaccine) are applied by mutation_finder.py
+    python /project-bin/mutation_finder.py \
+        --batch \
+        --sample ${meta.id} \
+        --subtype \$subtype_name \
+        --references ${sequence_references} \
+        --types human,inhibition_human,human_vaccine \
+        --threads ${task.cpus} \
+        ${args} \
+        ${fasta}
 
 
     cat <<-END_VERSIONS > versions.yml
@@ -35,6 +35,7 @@ process REPORTHUMAN {
 
 
     script:
+    def args = task.ext.args ?: ''
     """ 
 
     # Generate date
@@ -59,7 +60,7 @@ process REPORTHUMAN {
     # Add Release Version column
     awk -v version="${release_version}" -v OFS=',' '{ if (NR == 1) { print \$0, "Release Version" } else { print \$0, version } }' ${runid}_temp3.csv > ${runid}_temp4.csv
 
-    python /project-bin/report_QC_calculation.py ${runid}_temp4.csv -o ${runid}.csv
+    python /project-bin/report_QC_calculation.py ${runid}_temp4.csv -o ${runid}.csv ${args}
 
     #Merge all filtered fasta files to one
     cat ${filtered_fasta} > ${runid}.fasta
@@ -1,6 +1,6 @@
 
 process TABLELOOKUP_MAMMALIAN {
-    tag "$meta.id"
+    tag "run"
     label 'process_single'
     errorStrategy 'ignore'
     
@@ -11,13 +11,13 @@ process TABLELOOKUP_MAMMALIAN {
     containerOptions = "-v ${baseDir}/bin:/project-bin" // Mount the bin directory
 
     input:
-    tuple val(meta), path(mammalian_mutation), path(subtype)
+    tuple val(lookups), path(mammalian_mutation)    // lookups: [[meta, mutation file(s), subtype file], ...] for the whole run, see WorkflowFluseq.lookupBatch
     path(mammalian_mutation_table)
 
 
     output:
-    tuple val(meta), path("*mammalian.csv"), emit: mammalian_mutations
-    path("*.csv"), emit: lookup_report
+    path("*_mammalian.csv"), emit: lookup_report
+    path("run_mammalian_lookup.tsv"), emit: run_table
     path "versions.yml", emit: versions
 
     when:
@@ -25,7 +25,6 @@ process TABLELOOKUP_MAMMALIAN {
 
     script:
     def args = task.ext.args ?: ''
-    def prefix = task.ext.prefix ?: "${meta.id}"
     // TODO nf-core: Where possible, a command MUST be provided to obtain the version number of the software e.g. 1.10
     //               If the software is unable to output a version number on the command-line then it can be manually specified
     //               e.g. https://github.com/nf-core/modules/blob/master/modules/nf-core/homer/annotatepeaks/main.nf
@@ -35,31 +34,25 @@ process TABLELOOKUP_MAMMALIAN {
     //               using the Nextflow "task" variable e.g. "--threads $task.cpus"
     // TODO nf-core: Please replace the example samtools command below with your module's command
     // TODO nf-core: Please indent the command appropriately (4 spaces!!) to help with readability ;)
+    def manifest = lookups.collectMany { meta, files, subtype ->
+        def subtype_name = subtype.text.trim()
+        (files instanceof List ? files : [files]).collect { f ->
+            // segment is the second '_' field of the file name
+            [meta.id, f.baseName.split('_')[1], subtype_name, f.name, "mammalian"].join('\t')
+        }
+    }
     """
-    subtype_name=\$(cat ${subtype} )
-  
-    for mutation_file in ${mammalian_mutation}; do
-
-
-        type="mammalian"
-        filename=\$(basename \$mutation_file)
-        filename_no_ext=\${filename%.*}  
-        segment=\$(echo "\${filename_no_ext}" | awk -F_ '{print \$2}')
-
-        # Make output name
-        output_name=${meta.id}_\${segment}"_mammalian.csv"
-
-        python /project-bin/table_lookup_mammalian.py \
-        \$mutation_file\
-        \$output_name\
-        ${mammalian_mutation_table} \
-        \${segment} \
-        \${subtype_name} \
-        ${meta.id} \
-        \${type} \
-
-
-    done
+    cat <<-END_MANIFEST > lookup_manifest.tsv
+    sample\tsegment\tsubtype\tmutation_file\tmutation_type
+    ${manifest.join('\n    ')}
+    END_MANIFEST
+
+    python /project-bin/mutation_lookup.py \
+        --rules mammalian=${mammalian_mutation_table} \
+        --manifest lookup_manifest.tsv \
+        --run-table run_mammalian_lookup.tsv \
+        --any-subtype mammalian \
+        ${args}
 
     cat <<-END_VERSIONS > versions.yml
     "${task.process}":
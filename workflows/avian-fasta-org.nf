@@ -279,7 +279,8 @@ SEGMENTIFENTIFIER.out.fasta_segment
     def seq_quality_thershold = params.seq_quality_thershold
 
     COVERAGE (
-        FASTA_CONFIGURATION.out.fasta, seq_quality_thershold
+        FASTA_CONFIGURATION.out.fasta, seq_quality_thershold,
+        Channel.value(file("${params.sequence_references}/references_2324.fasta"))
     )
 
 
@@ -337,11 +338,11 @@ SEGMENTIFENTIFIER.out.fasta_segment
     def fullPath_inhibtion_mutation = "${currentDir}/${params.inhibtion_mutation_db }"
 
     TABLELOOKUP  (
-        MUTATION.out.inhibtion_mutation, fullPath_inhibtion_mutation
+        MUTATION.out.inhibtion_mutation.collect(flat: false).map { WorkflowFluseq.lookupBatch(it) }, fullPath_inhibtion_mutation
     )
 
     TABLELOOKUP_MAMMALIAN  (
-        MUTATION.out.mamailian_mutation, fullPath_mammalian_mutation
+        MUTATION.out.mamailian_mutation.collect(flat: false).map { WorkflowFluseq.lookupBatch(it) }, fullPath_mammalian_mutation
     )
 
     //
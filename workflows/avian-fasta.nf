@@ -340,7 +340,7 @@ workflow AVIANFASTA {
   REASSORTMENT( FASTA_CONFIGURATIONFASTA.out.fasta_flumut, Channel.value(reassortment_db) )
 
   /* 10) Coverage */
-  COVERAGE( FASTA_CONFIGURATIONFASTA.out.fasta, params.seq_quality_thershold )
+  COVERAGE( FASTA_CONFIGURATIONFASTA.out.fasta, params.seq_quality_thershold, Channel.value(ref_fasta) )
 
   /* 11) Nextclade */
   NEXTCLADE( COVERAGE.out.filtered_fasta )
@@ -415,11 +415,11 @@ workflow AVIANFASTA {
 
 
   TABLELOOKUP  (
-      ch_full_inhib, fullPath_inhibtion_mutation
+      ch_full_inhib.collect(flat: false).map { WorkflowFluseq.lookupBatch(it) }, fullPath_inhibtion_mutation
   )
 
   TABLELOOKUP_MAMMALIAN  (
-      ch_full_mamm, fullPath_mammalian_mutation
+      ch_full_mamm.collect(flat: false).map { WorkflowFluseq.lookupBatch(it) }, fullPath_mammalian_mutation
   )
 
   /* 14) Report (materialize leaf streams only) */
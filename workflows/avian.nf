@@ -55,6 +55,7 @@ include { AMINOACIDTRANSLATION        } from '../modules/local/aminoacidtranslat
 include { SUBTYPEFINDER               } from '../modules/local/blastn/main'
 include { GENOTYPING                  } from '../modules/local/genotyping/main'
 include { COVERAGE                    } from '../modules/local/coverage/main'
+include { BAM_COVERAGE                } from '../modules/local/bam_coverage/main'
 include { FASTA_CONFIGURATION         } from '../modules/local/seqkit/main'
 include { MUTATION                    } from '../modules/local/mutation/main'
 include { TABLELOOKUP_MAMMALIAN                } from '../modules/local/tablelookup_mammalian/main'
@@ -146,6 +147,16 @@ workflow AVIAN {
         CAT_FASTQ.out.reads
     )
 
+    //
+    // MODULE: BAM COVERAGE
+    //Breadth and depth coverage per segment from the IRMA BAMs
+
+    BAM_COVERAGE (
+        IRMA.out.bam
+    )
+
+    ch_versions = ch_versions.mix(BAM_COVERAGE.out.versions.first())
+
 
     /// SUBTYPE CHANNEL
     IRMA.out.fasta
@@ -246,7 +257,8 @@ workflow AVIAN {
 
     
     COVERAGE (
-         FASTA_CONFIGURATION.out.fasta, seq_quality_thershold
+         FASTA_CONFIGURATION.out.fasta, seq_quality_thershold,
+         Channel.value(file("${params.sequence_references}/references_2324.fasta"))
     )
 
 
@@ -283,7 +295,7 @@ workflow AVIAN {
 
 
     TABLELOOKUP_MAMMALIAN  (
-        AMINOACIDTRANSLATION.out.mutation_lookup_csv, Channel.value(file(params.mamalian_mutation_db))
+        AMINOACIDTRANSLATION.out.mutation_lookup_csv.collect(flat: false).map { WorkflowFluseq.lookupBatch(it) }, Channel.value(file(params.mamalian_mutation_db))
     )
 
 
@@ -296,7 +308,7 @@ workflow AVIAN {
     REPORT_AVIAN  (
         SUBTYPEFINDER.out.subtype_report.collect(), 
         GENOTYPING.out.genotype_report.collect(), 
-        COVERAGE.out.coverage_report.collect(),
+        COVERAGE.out.coverage_report.mix(BAM_COVERAGE.out.coverage_report).collect(),
         TABLELOOKUP_MAMMALIAN.out.lookup_report.collect(),
         AMINOACIDTRANSLATION.out.nextclade_csv.collect(),
         runid 
@@ -264,7 +264,7 @@ workflow HUMANFASTA {
   REASSORTMENT( FASTA_CONFIGURATIONFASTA.out.fasta_flumut, Channel.value(reassortment_db) )
 
   /* 10) Coverage */
-  COVERAGE( FASTA_CONFIGURATIONFASTA.out.fasta, params.seq_quality_thershold )
+  COVERAGE( FASTA_CONFIGURATIONFASTA.out.fasta, params.seq_quality_thershold, Channel.value(ref_fasta) )
 
   /* 11) Nextclade */
   NEXTCLADE( COVERAGE.out.filtered_fasta )
@@ -273,7 +273,7 @@ workflow HUMANFASTA {
   MUTATIONHUMAN( NEXTCLADE.out.aminoacid_sequence, Channel.value(ref_dir_all) )
 
   /* 13) Table lookups */
-  TABLELOOKUP( MUTATIONHUMAN.out.inhibtion_mutation, Channel.value(inhib_mut_db) )
+  TABLELOOKUP( MUTATIONHUMAN.out.inhibtion_mutation.collect(flat: false).map { WorkflowFluseq.lookupBatch(it) }, Channel.value(inhib_mut_db) )
 
   /* 14) Report (materialize leaf streams only) */
   REPORTHUMANFASTA(
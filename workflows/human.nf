@@ -62,7 +62,11 @@ include { TABLELOOKUP                 } from '../modules/local/tablelookup/main'
 include { REPORTHUMAN                 } from '../modules/local/reporthuman/main'
 include { TECHNICAL                   } from '../modules/local/technical/main'
 include { DEPTH_ANALYSIS              } from '../modules/local/depth_analysis/main'
+include { BAM_COVERAGE                } from '../modules/local/bam_coverage/main'
+include { DROPOUT_REGIONS             } from '../modules/local/dropout_regions/main'
+include { DEPTH_PYRAMID               } from '../modules/local/depth_pyramid/main'
 include { BASERATIO                   } from '../modules/local/baseratio/main'
+include { MINORVARIANTS               } from '../modules/local/minorvariants/main'
 include { CHOPPER                     } from '../modules/local/chopper/main'
 include { REASSORTMENT                } from '../modules/local/reassortment/main'
 
@@ -159,8 +163,46 @@ workflow HUMAN {
     //)
 
     //ch_versions = ch_versions.mix(BASERATIO.out.versions.first())
+
+    //
+    // MODULE: MINOR VARIANTS
+    //Mixed sites from the depth base counts; the summary joins the report on Sample
+    //and is used for the MS flag with REPORTHUMAN ext.args '--mixed-source depth'
+
+    //MINORVARIANTS (
+    //    DEPTH_ANALYSIS.out.depth_report.collect()
+    //)
+
+    //ch_versions = ch_versions.mix(MINORVARIANTS.out.versions)
+
+    //
+    // MODULE: DROPOUT REGIONS
+    //Gaps below the depth threshold per segment and their recurrence across the run
+
+    //DROPOUT_REGIONS (
+    //    DEPTH_ANALYSIS.out.depth_rle.collect()
+    //)
+
+    //
+    // MODULE: DEPTH PYRAMID
+    //Per-position, binned and per-segment depth of every sample in one file for plotting
+
+    //DEPTH_PYRAMID (
+    //    DEPTH_ANALYSIS.out.depth_pyramid.collect()
+    //)
     
     
+    //
+    // MODULE: BAM COVERAGE
+    //Breadth and depth coverage per segment from the IRMA BAMs
+
+    BAM_COVERAGE (
+        IRMA.out.bam
+    )
+
+    ch_versions = ch_versions.mix(BAM_COVERAGE.out.versions.first())
+
+
     //
     // MODULE: IRMA STAT
     //Get technical data from IRMA
@@ -249,7 +291,8 @@ workflow HUMAN {
     def seq_quality_thershold = params.seq_quality_thershold
 
     COVERAGE (
-         FASTA_CONFIGURATION.out.fasta, seq_quality_thershold
+         FASTA_CONFIGURATION.out.fasta, seq_quality_thershold,
+         Channel.value(file("${params.sequence_references}/references_2324.fasta"))
     )
 
     ch_versions = ch_versions.mix(COVERAGE.out.versions.first())
@@ -282,7 +325,7 @@ workflow HUMAN {
     //Check if mutations are annotated in mammalian and inhibition databases
 
     TABLELOOKUP  (
-        MUTATIONHUMAN.out.inhibtion_mutation, Channel.value(file(params.inhibtion_mutation_db))
+        MUTATIONHUMAN.out.inhibtion_mutation.collect(flat: false).map { WorkflowFluseq.lookupBatch(it) }, Channel.value(file(params.inhibtion_mutation_db))
         
     )
 
@@ -296,7 +339,8 @@ workflow HUMAN {
 
     REPORTHUMAN  (
         SUBTYPEFINDER.out.subtype_report.collect(), 
-        COVERAGE.out.coverage_report.collect(), 
+        COVERAGE.out.coverage_report.mix(BAM_COVERAGE.out.coverage_report).collect(), 
+        // with MINORVARIANTS: .mix(BAM_COVERAGE.out.coverage_report, MINORVARIANTS.out.summary)
         MUTATIONHUMAN.out.human_mutation_report.collect(), 
         MUTATIONHUMAN.out.inhibtion_mutation_report.collect(), 
         TABLELOOKUP.out.lookup_report.collect(),